@@ -1,15 +1,19 @@
+from __future__ import annotations
+
 import asyncio
 import os
 import warnings
-from typing import cast
+from typing import TYPE_CHECKING, cast
 
 import click
 from click import Context
 from rich import traceback
 from rich.console import Console
-from riptide_cli.loader import RiptideCliCtx
 from setproctitle import setproctitle
 
+if TYPE_CHECKING:
+    from riptide_cli.loader import RiptideCliCtx
+
 if __name__ == "__main__":
     warnings.simplefilter("ignore", DeprecationWarning)
     from riptide.config.errors import RiptideDeprecationWarning
@@ -23,18 +27,77 @@ if __name__ == "__main__":
         pass
 
 
-import riptide_cli.command.config
-import riptide_cli.command.db
-import riptide_cli.command.hook
-import riptide_cli.command.importt
-import riptide_cli.command.log
-import riptide_cli.command.project
-import riptide_cli.command.projects
-from riptide.config.loader import load_projects
-from riptide.plugin.loader import load_plugins
 from riptide.util import SystemFlag
 from riptide_cli.click import ClickMainGroup
+from riptide_cli.command.constants import (
+    CMD_CMD,
+    CMD_CONFIG_DUMP,
+    CMD_CONFIG_EDIT_PROJECT,
+    CMD_CONFIG_EDIT_USER,
+    CMD_CONFIG_GET,
+    CMD_DAEMON_START,
+    CMD_DAEMON_STATUS,
+    CMD_DAEMON_STOP,
+    CMD_DB_COPY,
+    CMD_DB_DROP,
+    CMD_DB_EXPORT,
+    CMD_DB_GC,
+    CMD_DB_IMPORT,
+    CMD_DB_LIST,
+    CMD_DB_NEW,
+    CMD_DB_STATUS,
+    CMD_DB_SWITCH,
+    CMD_EXEC,
+    CMD_HOOK_CONFIGURE,
+    CMD_HOOK_LIST,
+    CMD_HOOK_TRIGGER,
+    CMD_IMPORT_DB,
+    CMD_IMPORT_FILES,
+    CMD_LOG,
+    CMD_NOTES,
+    CMD_PROJECT_LIST,
+    CMD_PROJECT_REMOVE,
+    CMD_RESTART,
+    CMD_SETUP,
+    CMD_START,
+    CMD_START_FG,
+    CMD_STATUS,
+    CMD_STOP,
+    CMD_UPDATE,
+)
 from riptide_cli.helpers import RiptideCliError, warn
+from riptide_cli.output import META_STRUCTURED_OUTPUT
+
+# Sub commands and the modules that define them. Modules are only imported when one of their commands is used.
+SUBCOMMAND_MODULES = {
+    **dict.fromkeys(
+        [CMD_CONFIG_DUMP, CMD_CONFIG_GET, CMD_CONFIG_EDIT_USER, CMD_CONFIG_EDIT_PROJECT, CMD_UPDATE],
+        "riptide_cli.command.config",
+    ),
+    **dict.fromkeys(
+        [
+            CMD_DB_LIST,
+            CMD_DB_SWITCH,
+            CMD_DB_NEW,
+            CMD_DB_DROP,
+            CMD_DB_COPY,
+            CMD_DB_IMPORT,
+            CMD_DB_STATUS,
+            CMD_DB_EXPORT,
+            CMD_DB_GC,
+        ],
+        "riptide_cli.command.db",
+    ),
+    **dict.fromkeys([CMD_DAEMON_START, CMD_DAEMON_STOP, CMD_DAEMON_STATUS], "riptide_cli.command.daemon"),
+    **dict.fromkeys([CMD_HOOK_LIST, CMD_HOOK_CONFIGURE, CMD_HOOK_TRIGGER], "riptide_cli.command.hook"),
+    **dict.fromkeys([CMD_IMPORT_DB, CMD_IMPORT_FILES], "riptide_cli.command.importt"),
+    CMD_LOG: "riptide_cli.command.log",
+    **dict.fromkeys(
+        [CMD_STATUS, CMD_START, CMD_START_FG, CMD_STOP, CMD_RESTART, CMD_CMD, CMD_SETUP, CMD_EXEC, CMD_NOTES],
+        "riptide_cli.command.project",
+    ),
+    **dict.fromkeys([CMD_PROJECT_LIST, CMD_PROJECT_REMOVE], "riptide_cli.command.projects"),
+}
 
 
 def print_version():
@@ -46,7 +109,14 @@ def print_version():
             print(f"{dist.name:>30}: {version(dist.name)}")
 
 
-@click.group(name="riptide", cls=ClickMainGroup, help_headers_color="yellow", help_options_color="cyan", chain=True)
+@click.group(
+    name="riptide",
+    cls=ClickMainGroup,
+    help_headers_color="yellow",
+    help_options_color="cyan",
+    chain=True,
+    lazy_subcommands=SUBCOMMAND_MODULES,
+)
 @click.option(
     "-P",
     "--project",
@@ -63,6 +133,14 @@ def print_version():
 )
 @click.option("-v", "--verbose", is_flag=True, help="Print errors and debugging information.")
 @click.option("--skip-hooks", is_flag=True, help="Do not trigger any hooks.")
+@click.option(
+    "--status-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    envvar="RIPTIDE_STATUS_TIMEOUT",
+    show_envvar=True,
+    help="Seconds to wait for the engine to report the status of a service, before it is shown as unknown. "
+    "Default: 10.",
+)
 @click.option(
     "--rename",
     is_flag=True,
@@ -107,8 +185,9 @@ def cli(
         print_version()
         exit()
 
-    ctx = cast(RiptideCliCtx, ctx)
-    ctx.console = Console()
+    ctx = cast("RiptideCliCtx", ctx)
+    # Machine readable output is printed to stdout, everything else goes to stderr then.
+    ctx.console = Console(stderr=ctx.meta.get(META_STRUCTURED_OUTPUT, False))
     traceback.install(show_locals=True, suppress=[click, asyncio])
     ctx.riptide_options = {"verbose": verbose, "skip_hooks": skip_hooks}
 
@@ -130,6 +209,8 @@ def cli(
         warn(ctx.console, "Riptide shell integration not enabled.", boxed=True)
 
     if project:
+        from riptide.config.loader import load_projects
+
         projects = load_projects()
         if project in projects:
             project_file = projects[project]
@@ -145,17 +226,5 @@ def cli(
     ctx.riptide_options.update(kwargs)  # type: ignore
 
 
-# Load sub commands
-riptide_cli.command.config.load(cli)
-riptide_cli.command.db.load(cli)
-riptide_cli.command.hook.load(cli)
-riptide_cli.command.importt.load(cli)
-riptide_cli.command.log.load(cli)
-riptide_cli.command.project.load(cli)
-riptide_cli.command.projects.load(cli)
-for plugin in load_plugins().values():
-    plugin.after_load_cli(cli)
-
-
 if __name__ == "__main__":
     cli()
@@ -1,31 +1,124 @@
 """Click extension module"""
 
 # TODO: Colored subcommand help
-from click import Command
+from importlib import import_module
+from importlib.metadata import entry_points
+
+from click import ClickException, Command
 from click_help_colors import HelpColorsGroup
 
+# Entrypoint group plugins can use to statically declare their commands. The name of the entrypoint is the name
+# of the command, the object must be a Click command. Commands declared this way are only loaded when invoked.
+CLI_COMMAND_ENTRYPOINT_KEY = "riptide.cli_command"
+# Entrypoint group of Riptide plugins (riptide.plugin.loader.PLUGIN_ENTRYPOINT_KEY, not imported since loading
+# riptide.plugin is slow).
+PLUGIN_ENTRYPOINT_KEY = "riptide.plugin"
+
 
 class ClickMainGroup(HelpColorsGroup):
     """
     Special group class that allows grouping subcommands into sections using the @cli_section annotation.
+
+    Subcommands can be registered lazily by passing ``lazy_subcommands``, a mapping of command names to the
+    modules defining them. These modules must have a ``load(main)`` function that adds their commands to the group.
+    A module is only imported once one of its commands is actually requested. If Riptide plugins are installed,
+    all commands are loaded before the first one is returned instead, since plugins may change any of them in
+    ``after_load_cli``.
     """
 
     # Allow parsing all sub parameters, even those passed to sub commands
     allow_interspersed_args = True
     ignore_unknown_options = True
 
-    def __init__(self, *args, **kwargs):
+    lazy_subcommands: dict[str, str]
+    _loaded_modules: set[str]
+    _plugins_loaded: bool
+    _plugins_installed: bool | None
+
+    def __init__(self, *args, lazy_subcommands: dict[str, str] | None = None, **kwargs):
         # Dedicated help option not supported for this group because of the way it would catch subcommand help options.
         super().__init__(*args, **kwargs, add_help_option=False)
+        self.lazy_subcommands = lazy_subcommands if lazy_subcommands is not None else {}
+        self._loaded_modules = set()
+        self._plugins_loaded = False
+        self._plugins_installed = None
 
     def invoke(self, ctx):
         """'Fix' for Click not reading the '--version' or '--rename' flag without a sub command."""
+        self._parse_sub_command_options(ctx)
         if not ctx.protected_args and (
             ("version" in ctx.params and ctx.params["version"]) or ("rename" in ctx.params and ctx.params["rename"])
         ):
             return Command.invoke(self, ctx)
         return super().invoke(ctx)
 
+    def _parse_sub_command_options(self, ctx):
+        """
+        Parses the options of the sub command in advance, without invoking it. Click only parses them after the group
+        callback ran, which already needs to know some of them (for example whether format_option requests machine
+        readable output). Their callbacks can store these in ctx.meta. Errors are reported by the actual invocation.
+        """
+        if not ctx.protected_args:
+            return
+        try:
+            cmd_name, cmd, args = self.resolve_command(ctx, [*ctx.protected_args, *ctx.args])
+            if cmd is not None:
+                with cmd.make_context(cmd_name, args, parent=ctx, resilient_parsing=True):
+                    pass
+        except ClickException:
+            pass
+
+    def list_commands(self, ctx):
+        """Lists all commands. This needs to load all lazy commands and plugins."""
+        for module in set(self.lazy_subcommands.values()):
+            self._load_module(module)
+        self._load_plugins()
+        return super().list_commands(ctx)
+
+    def get_command(self, ctx, cmd_name):
+        """Returns the command, only loading the module (or plugins) that may define it."""
+        if self._has_plugins():
+            self._load_plugins()
+        elif cmd_name not in self.commands:
+            if cmd_name in self.lazy_subcommands:
+                self._load_module(self.lazy_subcommands[cmd_name])
+            else:
+                self._load_plugins()
+        return super().get_command(ctx, cmd_name)
+
+    def _load_module(self, module: str):
+        if module not in self._loaded_modules:
+            self._loaded_modules.add(module)
+            import_module(module).load(self)
+
+    def _has_plugins(self) -> bool:
+        """Whether Riptide plugins are installed. Only looks at their entrypoints, without loading them."""
+        if self._plugins_installed is None:
+            self._plugins_installed = len(entry_points().select(group=PLUGIN_ENTRYPOINT_KEY)) > 0
+        return self._plugins_installed
+
+    def _load_plugins(self):
+        """
+        Adds the commands of all plugins. Statically declared commands are loaded via their entrypoints,
+        all other plugins are loaded and may add their commands in ``after_load_cli``.
+        Plugins may also change built-in commands there, so these are all loaded before.
+        """
+        if self._plugins_loaded:
+            return
+        self._plugins_loaded = True
+        for entry_point in entry_points().select(group=CLI_COMMAND_ENTRYPOINT_KEY):
+            if entry_point.name not in self.commands:
+                self.add_command(entry_point.load(), entry_point.name)
+
+        from riptide.plugin.loader import load_plugins
+
+        plugins = load_plugins()
+        if plugins:
+            for module in set(self.lazy_subcommands.values()):
+                self._load_module(module)
+        for plugin in plugins.values():
+            plugin.after_load_cli(self)
+
     def format_commands(self, ctx, formatter):
         """
         Like multi command's version, but also grouping commands into subsections, if available.
@@ -0,0 +1,128 @@
+"""
+Thin client for the Riptide daemon (see riptide_cli.daemon).
+
+This module is the entrypoint of the ``riptide`` executable and the command aliases of the shell integration. It
+only imports a few lightweight modules, so it starts fast. If a daemon is running, the invocation is forwarded to it,
+including the standard streams, working directory and environment. Otherwise, or if the daemon can't handle it,
+the invocation runs in this process, just like without a daemon.
+
+Forwarding can be disabled by setting the environment variable ``RIPTIDE_NO_DAEMON``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+from typing import Any
+
+from riptide.config.files import riptide_config_dir
+from riptide_cli.command.constants import CMD_DAEMON_START, CMD_DAEMON_STATUS, CMD_DAEMON_STOP
+
+ENV_NO_DAEMON = "RIPTIDE_NO_DAEMON"
+DAEMON_SOCKET_NAME = "daemon.sock"
+# Commands that are never forwarded, because they manage the daemon itself.
+NOT_FORWARDED_COMMANDS = (CMD_DAEMON_START, CMD_DAEMON_STOP, CMD_DAEMON_STATUS)
+# Signals the client forwards to the process running the invocation.
+FORWARDED_SIGNALS = ("SIGINT", "SIGTERM", "SIGHUP", "SIGQUIT", "SIGWINCH")
+
+_HEADER = struct.Struct("!I")
+_RESULT = struct.Struct("!i")
+
+
+def daemon_socket_path() -> str:
+    """Path to the socket of the daemon for the current Riptide configuration directory."""
+    return os.path.join(riptide_config_dir(), DAEMON_SOCKET_NAME)
+
+
+def build_id() -> list[Any]:
+    """
+    Identifies the installed version of the CLI. The daemon refuses requests from clients with a different
+    build id, so invocations never run outdated code after an upgrade.
+    """
+    return [os.path.realpath(sys.executable), os.stat(os.path.dirname(__file__)).st_mtime_ns]
+
+
+def main():
+    """Entrypoint of the riptide executable."""
+    args = sys.argv[1:]
+    if not any(arg in NOT_FORWARDED_COMMANDS for arg in args):
+        exit_code = forward({"type": "cli", "args": args})
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+    from riptide_cli.__main__ import cli
+
+    cli()
+
+
+def run_cmd(command_name: str, arguments: list[str]):
+    """Entrypoint of the command aliases of the shell integration. Runs the command in the current project."""
+    exit_code = forward({"type": "cmd", "command": command_name, "args": arguments})
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    from riptide_cli.shell_integration import run_cmd as run_cmd_in_process
+
+    run_cmd_in_process(command_name, arguments)
+
+
+def forward(request: dict[str, Any]) -> int | None:
+    """
+    Forwards the invocation to the daemon and waits for it to finish.
+    Returns the exit code, or None if the invocation was not run by the daemon.
+    """
+    if ENV_NO_DAEMON in os.environ or not hasattr(socket, "send_fds"):
+        return None
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    except OSError:
+        return None
+
+    with sock:
+        try:
+            sock.connect(daemon_socket_path())
+            payload = json.dumps({**request, "build": build_id(), "cwd": os.getcwd(), "env": dict(os.environ)}).encode()
+            socket.send_fds(sock, [_HEADER.pack(len(payload)) + payload], [0, 1, 2])
+            # The daemon first answers with the pid of the process running the invocation or 0 if it refuses.
+            pid = _recv_int(sock)
+        except OSError:
+            return None
+        if not pid:
+            return None
+
+        previous_handlers = {}
+        for name in FORWARDED_SIGNALS:
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                previous_handlers[signum] = signal.signal(signum, lambda sig, _frame: _kill(pid, sig))
+        try:
+            exit_code = _recv_int(sock)
+        except OSError:
+            exit_code = None
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+    # The daemon process died without reporting back.
+    return 1 if exit_code is None else exit_code
+
+
+def _kill(pid: int, signum: int):
+    try:
+        os.kill(pid, signum)
+    except OSError:
+        pass
+
+
+def _recv_int(sock: socket.socket) -> int | None:
+    data = b""
+    while len(data) < _RESULT.size:
+        chunk = sock.recv(_RESULT.size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return _RESULT.unpack(data)[0]
@@ -0,0 +1,159 @@
+"""
+Copying the data directories of database environments.
+
+Files are cloned (reflinks), if the file system supports it (e.g. btrfs, XFS). This is nearly instant and needs
+no additional disk space, until the copies are changed. Otherwise, the files are copied by multiple threads,
+largest files first. Permissions, timestamps and (if running as root) owners are preserved.
+
+Copies can only be made this way if the current user can read all files and owns them (or is root); otherwise
+plan_copy returns None and the copy has to be made by the engine instead. Environments stored in named
+volumes are always copied by the engine.
+"""
+
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+import stat
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from riptide.db.environments import DbEnvironments
+
+COPY_WORKERS = 8
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+# ioctl to clone a file on Linux
+FICLONE = 0x40049409
+# Elsewhere, files are always copied.
+CLONE_SUPPORTED = sys.platform == "linux"
+# Errors of FICLONE and copy_file_range meaning the file system (combination) does not support them.
+_NOT_SUPPORTED = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EPERM}
+
+
+def environment_path(dbenv: DbEnvironments, name: str) -> str:
+    """Path to the data directory of a database environment (when not stored in named volumes)."""
+    assert dbenv.db_service is not None
+    return os.path.join(dbenv.db_service.volume_path(), "env", name)
+
+
+class TreeCopy:
+    """Copy of the files in the source directory to the (existing) target directory, see plan_copy."""
+
+    def __init__(self, source: str, target: str):
+        self.source = source
+        self.target = target
+        # Relative paths; files with their size.
+        self.dirs: list[str] = []
+        self.files: list[tuple[str, int]] = []
+        self.links: list[str] = []
+        self.total = 0
+        self.copied = 0
+        # Whether the files were cloned; None if that was not tried.
+        self.cloned: bool | None = None
+        self._lock = Lock()
+
+    def position(self) -> int:
+        return self.copied
+
+    def run(self):
+        for rel in self.dirs:
+            os.mkdir(os.path.join(self.target, rel))
+        for rel in self.links:
+            os.symlink(os.readlink(os.path.join(self.source, rel)), os.path.join(self.target, rel))
+        files = sorted(self.files, key=lambda file: file[1], reverse=True)
+        if files and CLONE_SUPPORTED:
+            # Either all files can be cloned or none; the first one tells.
+            self.cloned = self._clone(*files[0])
+        if self.cloned:
+            for rel, size in files[1:]:
+                if not self._clone(rel, size):
+                    self._copy(rel)
+        else:
+            with ThreadPoolExecutor(COPY_WORKERS) as executor:
+                for future in [executor.submit(self._copy, rel) for rel, _ in files]:
+                    future.result()
+        # Bottom-up, so copying the contents does not change the timestamps of the directories afterwards.
+        for rel in reversed(["", *self.dirs]):
+            self._copy_metadata(rel)
+
+    def _clone(self, rel: str, size: int) -> bool:
+        # Only available on Unix.
+        import fcntl
+
+        with open(os.path.join(self.source, rel), "rb") as src, open(os.path.join(self.target, rel), "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError as ex:
+                if ex.errno not in _NOT_SUPPORTED:
+                    raise
+                return False
+        self._copy_metadata(rel)
+        with self._lock:
+            self.copied += size
+        return True
+
+    def _copy(self, rel: str):
+        with open(os.path.join(self.source, rel), "rb") as src, open(os.path.join(self.target, rel), "wb") as dst:
+            # copy_file_range copies inside of the kernel (and clones on some file systems).
+            use_range = hasattr(os, "copy_file_range")
+            while True:
+                if use_range:
+                    try:
+                        count = os.copy_file_range(src.fileno(), dst.fileno(), COPY_CHUNK_SIZE)
+                    except OSError as ex:
+                        if ex.errno not in _NOT_SUPPORTED:
+                            raise
+                        use_range = False
+                        continue
+                else:
+                    count = dst.write(src.read(COPY_CHUNK_SIZE))
+                if not count:
+                    break
+                with self._lock:
+                    self.copied += count
+        self._copy_metadata(rel)
+
+    def _copy_metadata(self, rel: str):
+        source = os.path.join(self.source, rel)
+        target = os.path.join(self.target, rel)
+        shutil.copystat(source, target)
+        if os.geteuid() == 0:
+            st = os.stat(source)
+            os.chown(target, st.st_uid, st.st_gid)
+
+
+def plan_copy(source: str, target: str) -> TreeCopy | None:
+    """
+    Plans copying the files in source to target. Returns None if the current user can not copy them
+    faithfully (not readable, owned by another user or special files).
+    """
+    tree_copy = TreeCopy(source, target)
+    uid = os.geteuid()
+    try:
+        for dirpath, dirnames, filenames in os.walk(source, onerror=_raise):
+            for name in [*dirnames, *filenames]:
+                path = os.path.join(dirpath, name)
+                rel = os.path.relpath(path, source)
+                st = os.lstat(path)
+                if uid != 0 and st.st_uid != uid:
+                    return None
+                if stat.S_ISLNK(st.st_mode):
+                    tree_copy.links.append(rel)
+                elif stat.S_ISDIR(st.st_mode):
+                    tree_copy.dirs.append(rel)
+                elif stat.S_ISREG(st.st_mode) and os.access(path, os.R_OK):
+                    tree_copy.files.append((rel, st.st_size))
+                    tree_copy.total += st.st_size
+                else:
+                    return None
+            # Symlinks to directories are copied as links, not followed.
+            dirnames[:] = [name for name in dirnames if not os.path.islink(os.path.join(dirpath, name))]
+    except PermissionError:
+        return None
+    return tree_copy
+
+
+def _raise(ex: OSError):
+    raise ex
@@ -12,6 +12,7 @@ CMD_DB_COPY = "db-copy"
 CMD_DB_IMPORT = "db-import"
 CMD_DB_STATUS = "db-status"
 CMD_DB_EXPORT = "db-export"
+CMD_DB_GC = "db-gc"
 
 CMD_HOOK_LIST = "hook-configuration"
 CMD_HOOK_CONFIGURE = "hook-configure"
@@ -29,6 +30,11 @@ CMD_CMD = "cmd"
 CMD_SETUP = "setup"
 CMD_EXEC = "exec"
 CMD_NOTES = "notes"
+CMD_LOG = "log"
 
 CMD_PROJECT_LIST = "project-list"
 CMD_PROJECT_REMOVE = "project-remove"
+
+CMD_DAEMON_START = "daemon-start"
+CMD_DAEMON_STOP = "daemon-stop"
+CMD_DAEMON_STATUS = "daemon-status"
@@ -0,0 +1,94 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import click
+from riptide_cli.client import daemon_socket_path
+from riptide_cli.command.constants import CMD_DAEMON_START, CMD_DAEMON_STATUS, CMD_DAEMON_STOP
+from riptide_cli.daemon import DEFAULT_IDLE_TIMEOUT, running_daemon_pid
+from riptide_cli.helpers import RiptideCliError, cli_section
+
+# Time to wait for the daemon to start or stop (in seconds).
+DAEMON_WAIT_TIMEOUT = 30
+
+
+def load(main):
+    """Adds the commands to manage the Riptide daemon to the CLI"""
+
+    @cli_section("Daemon")
+    @main.command(CMD_DAEMON_START)
+    @click.option("--foreground", "-f", is_flag=True, help="Run the daemon in the foreground.")
+    @click.option(
+        "--idle-timeout",
+        "-t",
+        type=int,
+        default=DEFAULT_IDLE_TIMEOUT,
+        show_default=True,
+        help="Stop the daemon after not being used for this many seconds. 0 to never stop it.",
+    )
+    @click.pass_context
+    def start(ctx, foreground: bool, idle_timeout: int):
+        """
+        Starts the Riptide daemon.
+
+        The daemon keeps Riptide loaded in the background, which makes starting riptide and
+        the commands of projects faster. All invocations of riptide and of the commands of projects
+        are run by the daemon, if it is running.
+        """
+        if not hasattr(os, "fork"):
+            raise RiptideCliError("The Riptide daemon is not supported on this system.", ctx)
+        if running_daemon_pid() is not None:
+            ctx.parent.console.print("The Riptide daemon is already running.")
+            return
+
+        args = [sys.executable, "-m", "riptide_cli.daemon", str(idle_timeout)]
+        if foreground:
+            sys.exit(subprocess.call(args))
+
+        process = subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        deadline = time.monotonic() + DAEMON_WAIT_TIMEOUT
+        while running_daemon_pid() != process.pid:
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RiptideCliError(
+                    "The Riptide daemon failed to start. Run it with --foreground to see the error.", ctx
+                )
+            time.sleep(0.05)
+        ctx.parent.console.print(f"Riptide daemon started, listening on {daemon_socket_path()}.")
+
+    @cli_section("Daemon")
+    @main.command(CMD_DAEMON_STOP)
+    @click.pass_context
+    def stop(ctx):
+        """Stops the Riptide daemon."""
+        pid = running_daemon_pid()
+        if pid is None:
+            ctx.parent.console.print("The Riptide daemon is not running.")
+            return
+        os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + DAEMON_WAIT_TIMEOUT
+        while running_daemon_pid() is not None:
+            if time.monotonic() > deadline:
+                raise RiptideCliError("The Riptide daemon did not stop.", ctx)
+            time.sleep(0.05)
+        ctx.parent.console.print("Riptide daemon stopped.")
+
+    @cli_section("Daemon")
+    @main.command(CMD_DAEMON_STATUS)
+    @click.pass_context
+    def status(ctx):
+        """Shows whether the Riptide daemon is running."""
+        pid = running_daemon_pid()
+        if pid is None:
+            ctx.parent.console.print("The Riptide daemon is [bold]not running[/].")
+        else:
+            ctx.parent.console.print(
+                f"The Riptide daemon is [bold]running[/] (PID {pid}, socket {daemon_socket_path()})."
+            )
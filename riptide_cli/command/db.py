@@ -1,8 +1,11 @@
 import json
 import os
-from asyncio import sleep
+import time
+from collections.abc import Callable
+from functools import partial
 
 import click
+from rich.filesize import decimal
 from rich.live import Live
 from rich.markup import escape
 from rich.panel import Panel
@@ -10,22 +13,39 @@ from rich.table import Table
 from rich.tree import Tree
 from riptide.db.driver import db_driver_for_service
 from riptide.db.environments import DbEnvironments
+from riptide.db.impl.data_directory import DataDirectoryDbEnvImpl
 from riptide.hook.additional_volumes import HookHostPathArgument
 from riptide.hook.event import HookEvent
+from riptide_cli.clone import environment_path, plan_copy
 from riptide_cli.command.constants import (
     CMD_DB_COPY,
     CMD_DB_DROP,
     CMD_DB_EXPORT,
+    CMD_DB_GC,
     CMD_DB_IMPORT,
     CMD_DB_LIST,
     CMD_DB_NEW,
     CMD_DB_STATUS,
     CMD_DB_SWITCH,
 )
-from riptide_cli.helpers import RiptideCliError, async_command, cli_section
+from riptide_cli.compress import COMPRESSION_GZIP, COMPRESSION_ZSTD, detect_compression
+from riptide_cli.db_usage import DbUsage, format_ago
+from riptide_cli.dump import (
+    PIPES_SUPPORTED,
+    DumpPipe,
+    DumpReader,
+    DumpWriter,
+    decompressed_name,
+    parse_size,
+    temporary_dump,
+)
+from riptide_cli.helpers import RiptideCliError, async_command, cli_section, warn
 from riptide_cli.hook import trigger_and_handle_hook
 from riptide_cli.lifecycle import start_project, stop_project
 from riptide_cli.loader import cmd_constraint_project_loaded, load_riptide_core
+from riptide_cli.readiness import db_readiness_probe, wait_for_db
+from riptide_cli.status import status_collector
+from riptide_cli.transfer import Sampler, export_sampler, import_sampler, track_transfer, unknown_progress
 
 
 def cmd_constraint_has_db(ctx):
@@ -72,6 +92,14 @@ def load(main):
         for key, label in db_driver.collect_info().items():
             grid.add_row(escape(key) + ": ", escape(label))
 
+        db_usage = DbUsage(dbenv)
+        usages = {env: db_usage.usage(env) for env in dbenv.list()}
+        db_usage.save()
+        usage = usages.get(current)
+        if usage is not None and usage.size is not None:
+            grid.add_row("Size: ", f"{decimal(usage.size)} ({usage.files} files)")
+            grid.add_row("All environments: ", decimal(sum(usage.size or 0 for usage in usages.values())))
+
         ctx.console.print(grid)
 
     @cli_section("Database")
@@ -90,18 +118,34 @@ def load(main):
 
         cur = dbenv.currently_selected_name()
 
+        if not current:
+            envs = dbenv.list()
+            db_usage = DbUsage(dbenv)
+            usages = {env: db_usage.usage(env) for env in envs}
+            db_usage.save()
+
         if not machine_readable and not current:
             db_tree = Tree("Database environments")
 
-            for env in dbenv.list():
+            for env in envs:
+                usage = usages[env]
+                details = (
+                    f"[dim]({decimal(usage.size)}, {usage.files} files, last used {format_ago(usage.last_used)})[/]"
+                    if usage.size is not None
+                    else f"[dim](last used {format_ago(usage.last_used)})[/]"
+                )
                 if env == cur:
-                    db_tree.add(f"{env} [bold](Current)[/]")
+                    db_tree.add(f"{env} [bold](Current)[/] {details}")
                 else:
-                    db_tree.add(env)
+                    db_tree.add(f"{env} {details}")
 
             ctx.console.print(db_tree)
         elif not current:
-            print(json.dumps({"envs": dbenv.list(), "current": cur}))
+            print(
+                json.dumps(
+                    {"envs": envs, "current": cur, "usage": {env: usage.to_dict() for env, usage in usages.items()}}
+                )
+            )
         else:
             print(cur)
 
@@ -109,13 +153,19 @@ def load(main):
     @main.command(CMD_DB_SWITCH)
     @click.pass_context
     @click.argument("name")
+    @click.option(
+        "-q",
+        "--quick",
+        is_flag=True,
+        help="Skip the pre_start and post_start commands and the status when restarting the database.",
+    )
     @async_command()
-    async def switch(ctx, name):
+    async def switch(ctx, name, quick):
         """Switches the active database environment"""
         load_riptide_core(ctx)
         cmd_constraint_has_db(ctx)
 
-        await switch_impl(ctx, name)
+        await switch_impl(ctx, name, quick)
 
     @cli_section("Database")
     @main.command(CMD_DB_NEW)
@@ -136,6 +186,9 @@ def load(main):
 
         try:
             dbenv.new(name, copy_from=None)
+            db_usage = DbUsage(dbenv)
+            db_usage.record_use(name)
+            db_usage.save()
             ctx.console.print(
                 Panel(
                     f"New environment '{name}' created",
@@ -177,6 +230,9 @@ def load(main):
             with Live(panel, refresh_per_second=5, console=ctx.console):
                 dbenv.drop(name)
                 panel.renderable = f"Database environment '{name}' deleted."
+            db_usage = DbUsage(dbenv)
+            db_usage.forget(name)
+            db_usage.save()
         except FileNotFoundError:
             raise RiptideCliError("Environment with this name does not exist.", ctx)
         except OSError:
@@ -202,16 +258,15 @@ def load(main):
 
         trigger_and_handle_hook(ctx, HookEvent.PreDbCopy, [name_to_copy, name_new])
 
-        # 2. Import
-        panel = Panel(
-            f"Copying from '{escape(name_to_copy)}' to '{escape(name_new)}'... this may take a while...",
-            title="Copying database environment",
-            title_align="left",
-        )
+        # 2. Copy
         try:
-            with Live(panel, refresh_per_second=5, console=ctx.console):
-                dbenv.new(name_new, copy_from=name_to_copy)
-                panel.renderable = f"New environment '{name_new}' created"
+            if not dbenv.impl.exists(name_to_copy):
+                raise FileNotFoundError("Database environment to copy from not found")
+            dbenv.new(name_new)
+            await _copy_environment(ctx, dbenv, name_to_copy, name_new)
+            db_usage = DbUsage(dbenv)
+            db_usage.record_use(name_new)
+            db_usage.save()
         except FileExistsError:
             raise RiptideCliError("Environment with this name already exists.", ctx)
         except FileNotFoundError:
@@ -244,9 +299,21 @@ def load(main):
     @cli_section("Database")
     @main.command(CMD_DB_EXPORT)
     @click.argument("file")
+    @click.option(
+        "--compress",
+        type=click.Choice((COMPRESSION_GZIP, COMPRESSION_ZSTD)),
+        default=None,
+        help="Compress the dump while it is exported. db-import detects and decompresses it.",
+    )
+    @click.option(
+        "--split",
+        metavar="SIZE",
+        default=None,
+        help="Split the dump into files of this size (e.g. 500M, 2G), named FILE.001, FILE.002, etc.",
+    )
     @click.pass_context
     @async_command()
-    async def export(ctx, file):
+    async def export(ctx, file, compress, split):
         """
         Export database dump from the current environment.
         The format of the dump depends on the database driver.
@@ -254,6 +321,11 @@ def load(main):
         load_riptide_core(ctx)
         cmd_constraint_has_db(ctx)
 
+        try:
+            chunk_size = parse_size(split) if split is not None else None
+        except ValueError as ex:
+            raise RiptideCliError(str(ex), ctx)
+
         project = ctx.system_config["project"]
         engine = ctx.engine
         dbenv = DbEnvironments(project, engine)
@@ -263,19 +335,29 @@ def load(main):
         db_driver = db_driver_for_service.get(dbenv.db_service)
         assert db_driver is not None  # todo: error handling
 
-        # 1. If not running, start database
-        was_running = engine.status(project)[db_name]
+        # 1. If not running (or unknown), start database
+        was_running = status_collector(ctx).running(db_name)
         if not was_running:
+            probe = db_readiness_probe(project, engine, dbenv.db_service, db_driver)
             await start_project(ctx, [db_name], show_status=False)
+            await wait_for_db(ctx, probe)
 
         trigger_and_handle_hook(ctx, HookEvent.PreDbExport, [env_name])
 
         # 2. Export
-        panel = Panel(f"Exporting from '{env_name}'... this may take a while...", title="Exporting", title_align="left")
         try:
-            with Live(panel, refresh_per_second=5, console=ctx.console):
-                db_driver.export(engine, file)
-                panel.renderable = f"Database environment '{env_name}' exported to '{file}'."
+            if compress is None and chunk_size is None:
+                await track_transfer(
+                    ctx.console,
+                    "Exporting",
+                    f"Exporting from '{escape(env_name)}'",
+                    lambda: db_driver.export(engine, file),
+                    export_sampler(os.path.abspath(file)),
+                    None,
+                    f"Database environment '{env_name}' exported to '{file}'.",
+                )
+            else:
+                await _export_dump(ctx, db_driver, env_name, os.path.abspath(file), compress, chunk_size)
         except FileNotFoundError:
             raise RiptideCliError("Environment does not exist. Create it first with db-create", ctx)
         except Exception as ex:
@@ -283,39 +365,141 @@ def load(main):
 
         trigger_and_handle_hook(ctx, HookEvent.PostDbExport, [env_name, HookHostPathArgument(file)])
 
+    @cli_section("Database")
+    @main.command(CMD_DB_GC)
+    @click.pass_context
+    @click.option(
+        "--days",
+        type=click.IntRange(min=1),
+        default=30,
+        show_default=True,
+        help="Delete environments not used for this many days.",
+    )
+    @click.option("-n", "--dry-run", is_flag=True, help="Only list the environments that would be deleted.")
+    @click.option("-y", "--yes", is_flag=True, help="Don't ask for confirmation.")
+    def gc(ctx, days, dry_run, yes):
+        """
+        Delete database environments that were not used for a while.
+        The active environment and environments with an unknown last use are never deleted.
+        """
+        load_riptide_core(ctx)
+        cmd_constraint_has_db(ctx)
 
-async def switch_impl(ctx, name):
+        project = ctx.system_config["project"]
+        engine = ctx.engine
+        dbenv = DbEnvironments(project, engine)
+        current = dbenv.currently_selected_name()
+        db_usage = DbUsage(dbenv)
+        cutoff = time.time() - days * 86400
+
+        candidates = {}
+        for env in dbenv.list():
+            usage = db_usage.usage(env)
+            if env != current and usage.last_used is not None and usage.last_used < cutoff:
+                candidates[env] = usage
+        db_usage.save()
+
+        if not candidates:
+            ctx.console.print(f"No database environments unused for {days} days.")
+            return
+
+        ctx.console.print(f"Database environments unused for {days} days:")
+        table = Table()
+        table.add_column("Environment")
+        table.add_column("Size", justify="right")
+        table.add_column("Last used")
+        for env, usage in candidates.items():
+            table.add_row(
+                escape(env), decimal(usage.size) if usage.size is not None else "unknown", format_ago(usage.last_used)
+            )
+        ctx.console.print(table)
+        reclaimable = decimal(sum(usage.size or 0 for usage in candidates.values()))
+
+        if dry_run:
+            ctx.console.print(f"Deleting them would free {reclaimable}.")
+            return
+        if not yes and not click.confirm(f"Delete {len(candidates)} environment(s), freeing {reclaimable}?"):
+            return
+
+        panel = Panel("", title="Deleting database environments", title_align="left")
+        with Live(panel, refresh_per_second=5, console=ctx.console):
+            for env in candidates:
+                panel.renderable = f"Deleting environment '{escape(env)}'... this may take a while..."
+                try:
+                    dbenv.drop(env)
+                except Exception as ex:
+                    # Keep what is known about the environments deleted so far.
+                    db_usage.save()
+                    raise RiptideCliError(f"Error deleting environment '{env}'", ctx) from ex
+                db_usage.forget(env)
+            panel.renderable = f"Deleted {len(candidates)} database environment(s), freed {reclaimable}."
+        db_usage.save()
+
+
+async def switch_impl(ctx, name, quick=False):
+    """
+    Switches the environment, restarting the database if it is running.
+    If quick is True, pre_start and post_start commands are skipped when starting it again.
+    """
     project = ctx.system_config["project"]
     engine = ctx.engine
     dbenv = DbEnvironments(project, engine)
     assert dbenv.db_service is not None
     db_name = dbenv.db_service["$name"]
+    current = dbenv.currently_selected_name()
 
-    trigger_and_handle_hook(ctx, HookEvent.PreDbSwitch, [dbenv.currently_selected_name(), name])
+    if name == current:
+        ctx.console.print(
+            Panel(
+                f"Environment '{name}' is already active.", title="Switching database environment", title_align="left"
+            )
+        )
+        return
+    # Checked before stopping, so the database is not stopped for nothing.
+    if not dbenv.impl.exists(name):
+        raise RiptideCliError("Environment does not exist. Create it with db-new or db-copy.", ctx)
+
+    trigger_and_handle_hook(ctx, HookEvent.PreDbSwitch, [current, name])
+    timings = []
 
-    # 1. If running, stop database
-    was_running = engine.status(project)[db_name]
+    # 1. If running (or unknown), stop database
+    was_running = status_collector(ctx).running(db_name) is not False
     if was_running:
+        start = time.monotonic()
         await stop_project(ctx, [db_name], show_status=False)
+        timings.append(("stopping", time.monotonic() - start))
 
     # 2. Switch environment
+    start = time.monotonic()
     try:
         dbenv.switch(name)
-        ctx.console.print(
-            Panel(
-                f"Environment switched to '{name}'",
-                title="Switching database environment",
-                title_align="left",
-            )
-        )
     except FileNotFoundError:
         raise RiptideCliError("Environment does not exist. Create it with db-new or db-copy.", ctx)
     except Exception as ex:
         raise RiptideCliError("Error switching environments", ctx) from ex
+    timings.append(("switching", time.monotonic() - start))
+    db_usage = DbUsage(dbenv)
+    db_usage.record_use(current, name)
+    db_usage.save()
+    ctx.console.print(
+        Panel(
+            f"Environment switched to '{name}'",
+            title="Switching database environment",
+            title_align="left",
+        )
+    )
 
     # 3. If was running: start database again
     if was_running:
-        await start_project(ctx, [db_name])
+        start = time.monotonic()
+        await start_project(ctx, [db_name], show_status=not quick, quick=quick)
+        timings.append(("starting", time.monotonic() - start))
+        total = sum(duration for _, duration in timings)
+        ctx.console.print(
+            "[dim]"
+            + ", ".join(f"{phase} {duration:.1f}s" for phase, duration in timings).capitalize()
+            + f" (total {total:.1f}s)"
+        )
 
     trigger_and_handle_hook(ctx, HookEvent.PostDbSwitch, [name])
 
@@ -336,26 +520,18 @@ async def importt_impl(ctx, file):
     if not os.path.exists(os.path.abspath(file)):
         raise RiptideCliError("The path does not exist.", ctx)
 
-    # 1. If not running, start database
-    was_running = engine.status(project)[db_name]
+    # 1. If not running (or unknown), start database
+    was_running = status_collector(ctx).running(db_name)
     if not was_running:
+        probe = db_readiness_probe(project, engine, dbenv.db_service, db_driver)
         await start_project(ctx, [db_name], show_status=False)
-        # TODO: Some databases need a while. How to do this better? mysqladmin for example doesn't help :(
-        await sleep(15)
+        await wait_for_db(ctx, probe)
 
     trigger_and_handle_hook(ctx, HookEvent.PreDbImport, [env_name, HookHostPathArgument(file)])
 
     # 2. Import
-    panel = Panel(
-        f"Importing into database environment '{env_name}'... this may take a while...",
-        title="Importing database environment",
-        title_align="left",
-    )
     try:
-        with Live(panel, refresh_per_second=5, console=ctx.console):
-            db_driver.importt(engine, os.path.abspath(file))
-            panel.renderable = f"Database environment '{env_name}' imported."
-
+        await _import_dump(ctx, db_driver, env_name, os.path.abspath(file))
     except FileNotFoundError:
         raise RiptideCliError("Environment does not exist. Create it first with db:create", ctx)
     except Exception as ex:
@@ -364,3 +540,171 @@ async def importt_impl(ctx, file):
     trigger_and_handle_hook(ctx, HookEvent.PostDbImport, [env_name, HookHostPathArgument(file)])
 
     return True
+
+
+async def _import_dump(ctx, db_driver, env_name: str, path: str):
+    """Imports the dump; compressed dumps are decompressed while importing (see riptide_cli.dump)."""
+    engine = ctx.engine
+    title = "Importing database environment"
+    description = f"Importing into '{escape(env_name)}'"
+    done_message = f"Database environment '{env_name}' imported."
+    compression = None if os.path.isdir(path) else detect_compression(path)
+    if compression is None:
+        await track_transfer(
+            ctx.console,
+            title,
+            description,
+            lambda: db_driver.importt(engine, path),
+            import_sampler(path),
+            None if os.path.isdir(path) else os.path.getsize(path),
+            done_message,
+        )
+        return
+
+    if PIPES_SUPPORTED:
+        dump = DumpReader(path, compression)
+        try:
+            with DumpPipe(decompressed_name(path), "wb", dump.copy_to) as pipe:
+
+                def import_from_pipe():
+                    db_driver.importt(engine, pipe.path)
+                    pipe.finish()
+
+                try:
+                    await track_transfer(
+                        ctx.console,
+                        title,
+                        f"{description} ({compression})",
+                        import_from_pipe,
+                        dump.position,
+                        dump.size,
+                        done_message,
+                    )
+                    return
+                except Exception:
+                    if pipe.connected:
+                        raise
+        finally:
+            dump.close()
+        warn(ctx.console, "The database driver did not read the dump from a pipe, decompressing it first instead.")
+
+    with temporary_dump(path) as decompressed_path:
+        dump = DumpReader(path, compression)
+        try:
+
+            def decompress():
+                with open(decompressed_path, "wb") as out:
+                    dump.copy_to(out)
+
+            await track_transfer(
+                ctx.console,
+                "Decompressing dump",
+                f"Decompressing '{escape(os.path.basename(path))}' ({compression})",
+                decompress,
+                dump.position,
+                dump.size,
+                "Dump decompressed.",
+            )
+        finally:
+            dump.close()
+        await track_transfer(
+            ctx.console,
+            title,
+            description,
+            lambda: db_driver.importt(engine, decompressed_path),
+            import_sampler(decompressed_path),
+            os.path.getsize(decompressed_path),
+            done_message,
+        )
+
+
+async def _export_dump(ctx, db_driver, env_name: str, path: str, compression: str | None, chunk_size: int | None):
+    """Exports the dump, compressed and/or split into chunks while exporting (see riptide_cli.dump)."""
+    engine = ctx.engine
+    title = "Exporting"
+    description = f"Exporting from '{escape(env_name)}'"
+    if compression is not None:
+        description += f" ({compression})"
+    done_message = f"Database environment '{env_name}' exported to '{path}'."
+    writer = DumpWriter(path, compression, chunk_size)
+    try:
+        exported = False
+        if PIPES_SUPPORTED:
+            with DumpPipe(os.path.basename(path), "rb", writer.copy_from) as pipe:
+
+                def export_to_pipe():
+                    db_driver.export(engine, pipe.path)
+                    pipe.finish()
+
+                try:
+                    await track_transfer(
+                        ctx.console, title, description, export_to_pipe, writer.position, None, done_message
+                    )
+                    exported = True
+                except Exception:
+                    if pipe.connected:
+                        raise
+            if not exported:
+                warn(ctx.console, "The database driver did not write the dump to a pipe, exporting it first instead.")
+
+        if not exported:
+            with temporary_dump(path) as exported_path:
+                await track_transfer(
+                    ctx.console,
+                    title,
+                    f"Exporting from '{escape(env_name)}'",
+                    lambda: db_driver.export(engine, exported_path),
+                    export_sampler(exported_path),
+                    None,
+                    "Dump exported.",
+                )
+                if os.path.isdir(exported_path):
+                    raise IsADirectoryError("Dumps exported as directories can not be compressed or split.")
+                await track_transfer(
+                    ctx.console,
+                    "Writing dump",
+                    f"Writing '{escape(os.path.basename(path))}'",
+                    lambda: writer.copy_file(exported_path),
+                    writer.position,
+                    os.path.getsize(exported_path),
+                    done_message,
+                )
+    finally:
+        writer.close()
+    if writer.paths is not None:
+        ctx.console.print(f"Split into {len(writer.paths)} files: {escape(', '.join(writer.paths))}")
+
+
+async def _copy_environment(ctx, dbenv: DbEnvironments, name_to_copy: str, name_new: str):
+    """Copies the data of an environment into the new (empty) environment (see riptide_cli.clone)."""
+    data_directory = isinstance(dbenv.impl, DataDirectoryDbEnvImpl)
+    target = environment_path(dbenv, name_new)
+    tree_copy = plan_copy(environment_path(dbenv, name_to_copy), target) if data_directory else None
+    work: Callable[[], None]
+    sample: Sampler
+    if tree_copy is not None:
+        work, sample, total = tree_copy.run, tree_copy.position, tree_copy.total
+    else:
+        # Copied by the engine
+        work = partial(dbenv.impl.copy, name_to_copy, name_new)
+        sample = export_sampler(target) if data_directory else unknown_progress
+        total = None
+    try:
+        await track_transfer(
+            ctx.console,
+            "Copying database environment",
+            f"Copying '{escape(name_to_copy)}' to '{escape(name_new)}'",
+            work,
+            sample,
+            total,
+            f"New environment '{name_new}' created.",
+        )
+    except Exception:
+        # Don't leave a partial copy behind.
+        try:
+            dbenv.drop(name_new)
+        except Exception:
+            pass
+        raise
+    if tree_copy is not None and tree_copy.cloned:
+        ctx.console.print("The files were cloned, they only take up additional disk space once they are changed.")
@@ -14,6 +14,7 @@ from riptide_cli.command.constants import (
 from riptide_cli.helpers import RiptideCliError, cli_section, warn
 from riptide_cli.hook import trigger_and_handle_hook
 from riptide_cli.loader import RiptideCliCtx, load_riptide_core
+from riptide_cli.output import FORMAT_TEXT, format_option, print_structured
 from setproctitle import setproctitle
 
 
@@ -36,8 +37,9 @@ def load(main):
         is_flag=True,
         help="Also list events that currently have no hooks defined.",
     )
+    @format_option
     @click.pass_context
-    def configuration(ctx, all: bool, default: bool):
+    def configuration(ctx, all: bool, default: bool, output_format: str):
         """List currently registered hooks and their current configuration."""
         ctx = cast(RiptideCliCtx, ctx)
         load_riptide_core(ctx, skip_project_load=default)
@@ -46,6 +48,24 @@ def load(main):
         (defaults, events) = ctx.hook_manager.get_current_configuration()
         events = sorted(events, key=lambda e: HookEvent.key_for(e["event"]))
 
+        if output_format != FORMAT_TEXT:
+            entries = [
+                {
+                    "event": HookEvent.key_for(event["event"]),
+                    "enabled": event["enabled"],
+                    "wait_time": event["wait_time"],
+                    "hooks": [{"key": hook["key"], "defined_in": hook["defined_in"]} for hook in event["hooks"]],
+                }
+                for event in events
+                if all or len(event["hooks"]) > 0
+            ]
+            document = {
+                "default": {"enabled": defaults["enabled"], "wait_time": defaults["wait_time"]},
+                "events": entries,
+            }
+            print_structured(output_format, document, entries)
+            return
+
         hook_tree = Tree("Event Configuration")
         default_branch = hook_tree.add("<Default>")
         add_hook_status(default_branch, defaults, not default, None)
@@ -1,11 +1,14 @@
+import heapq
+import itertools
 import os
+import re
 import sys
-import time
+from collections import deque
+from collections.abc import Iterator
 from dataclasses import dataclass
-from queue import Empty, SimpleQueue
 from random import Random
 from threading import Thread
-from typing import Sequence, cast
+from typing import Hashable, NamedTuple, Sequence, cast
 
 import click
 from rich.console import Console
@@ -13,18 +16,36 @@ from rich.style import Style
 from rich.text import Text
 from riptide.config.document.service import Service
 from riptide.config.service.logging import get_logging_path_for
+from riptide_cli.command.constants import CMD_LOG
 from riptide_cli.command.project import cmd_constraint_project_set_up
-from riptide_cli.helpers import cli_section
+from riptide_cli.compress import iter_lines, open_decompressed
+from riptide_cli.helpers import RiptideCliError, cli_section
 from riptide_cli.loader import RiptideCliCtx, load_riptide_core
+from riptide_cli.logs.buffer import OVERFLOW_BLOCK, OVERFLOW_POLICIES, LineBuffers
+from riptide_cli.logs.export import LogExporter
+from riptide_cli.logs.filter import LEVEL_NAMES, LogFilter, parse_time
+from riptide_cli.logs.follow import FollowedFile, LogFollower
+from riptide_cli.logs.index import log_index
+from riptide_cli.logs.rotated import rotated_files
+from riptide_cli.logs.tail import last_marker_end, tail_start
+from riptide_cli.logs.timestamps import detect_time
 
 STD_LOG_START_MARKER = "SERVICE RESTART -"
+STD_LOG_START_MARKER_BYTES = STD_LOG_START_MARKER.encode()
+# Maximum number of lines printed at once.
+PRINT_BATCH_SIZE = 1000
+ANSI_ESCAPE = re.compile(r"\x1b(\[[0-?]*[ -/]*[@-~]|[@-Z\\-_])")
+# Buffer used for all lines with --merge.
+MERGED_SOURCE = "merged"
+# Number of lines of each log file printed before following it, if not set with --lines.
+DEFAULT_FOLLOW_LINES = 10
 
 
 def load(main):
     """Adds the `log` command."""
 
     @cli_section("Service")
-    @main.command()
+    @main.command(CMD_LOG)
     @click.pass_context
     @click.option(
         "--services", "-s", required=False, help="Limit the log output to one or more services (comma-seperated)."
@@ -41,7 +62,65 @@ def load(main):
         "-h",
         required=False,
         is_flag=True,
-        help="Show log output of previous service runs as well (only relevant for stdout, stderr).",
+        help="Show log output of previous service runs as well, including rotated log files (.1, .gz, .zst, ...).",
+    )
+    @click.option(
+        "--run",
+        required=False,
+        type=click.IntRange(min=0),
+        help="Start with the output of a previous service run: 0 is the current run, 1 the run before, etc.",
+    )
+    @click.option(
+        "--line",
+        required=False,
+        type=click.IntRange(min=1),
+        help="Start at this line number of each log file.",
+    )
+    @click.option(
+        "--lines",
+        "-n",
+        required=False,
+        type=click.IntRange(min=0),
+        help="Only print the last n lines of each log file. Default: all, or 10 when following.",
+    )
+    @click.option("--grep", "-g", required=False, help="Only print lines matching this regular expression.")
+    @click.option(
+        "--since",
+        required=False,
+        help="Only print lines logged at or after this time: ISO 8601 date/time or a duration before now (10m, 2h).",
+    )
+    @click.option(
+        "--until",
+        required=False,
+        help="Only print lines logged at or before this time: ISO 8601 date and time or a duration before now.",
+    )
+    @click.option(
+        "--level",
+        required=False,
+        type=click.Choice(LEVEL_NAMES, case_sensitive=False),
+        help="Only print lines with at least this severity.",
+    )
+    @click.option(
+        "--merge",
+        "-m",
+        required=False,
+        is_flag=True,
+        help="Print the lines of all log files ordered by their timestamps, instead of one log file after another.",
+    )
+    @click.option(
+        "--export",
+        "-o",
+        required=False,
+        type=click.Path(dir_okay=False, writable=True),
+        help="Write the selected lines to this file as NDJSON instead of printing them. "
+        "Compressed based on the extension (.gz, .zst, .bz2, .xz).",
+    )
+    @click.option(
+        "--overflow",
+        type=click.Choice(OVERFLOW_POLICIES),
+        default=OVERFLOW_BLOCK,
+        show_default=True,
+        help="If following a log file faster than it can be printed: Wait (block) or drop the oldest lines (drop).",
     )
     @click.option(
         "--show-names/--no-show-names",
@@ -50,7 +129,24 @@ def load(main):
         is_flag=True,
         help="Whether to show the service name and logfile key; by default on if TTY.",
     )
-    def log(ctx, services: str, logs: str, follow: bool, historic: bool, show_names: bool | None):
+    def log(
+        ctx,
+        services: str,
+        logs: str,
+        follow: bool,
+        historic: bool,
+        run: int | None,
+        line: int | None,
+        lines: int | None,
+        grep: str | None,
+        since: str | None,
+        until: str | None,
+        level: str | None,
+        merge: bool,
+        export: str | None,
+        overflow: str,
+        show_names: bool | None,
+    ):
         """
         Prints service logfiles and stdout/stderr.
 
@@ -66,6 +162,14 @@ def load(main):
 
         if show_names is None:
             show_names = sys.stdin.isatty()
+        if historic + (run is not None) + (line is not None) > 1:
+            raise RiptideCliError("Only one of --historic, --run and --line can be used.", ctx)
+        if export is not None and follow:
+            raise RiptideCliError("--export can not be used with --follow.", ctx)
+        if lines is None and follow:
+            lines = DEFAULT_FOLLOW_LINES
+        selection = LogSelection(historic=historic, run=run, line=line, lines=lines)
+        log_filter = _log_filter(ctx, grep, since, until, level)
 
         load_riptide_core(ctx)
         cmd_constraint_project_set_up(ctx)
@@ -89,28 +193,52 @@ def load(main):
                         for name in service["logging"]["commands"].keys():
                             prefix_len = _add_log(prefix_len, logs_filter, service, service_key, name, logfiles)
 
-        queue: SimpleQueue[LineMsg] = SimpleQueue()
-        printer = Printer(ctx.console, Console(stderr=True), prefix_len if show_names else None, queue)
+        buffers: LineBuffers[LineMsg] = LineBuffers(overflow, _dropped_msg)
+        printer = Printer(ctx.console, Console(stderr=True), prefix_len if show_names else None, buffers)
         printer.start()
 
-        logthreads = []
-        for service_key, logkey, logfile in logfiles:
-            logthread = Logwatcher(follow, historic, logfile, service_key, logkey, queue)
-            logthreads.append(logthread)
-            logthread.start()
-
+        follower = None
         try:
-            for t in logthreads:
-                t.join()
+            sources = []
+            for service_key, logkey, logfile in logfiles:
+                source = read_log(follow, selection, log_filter, logfile, service_key, logkey, buffers)
+                if source is not None:
+                    sources.append(source)
+
+            mark_restarts = follow or selection.includes_restarts
+            if export is not None:
+                _export(ctx, export, sources, merge)
+            elif merge:
+                # All lines are put into a single buffer, so the printer keeps their order.
+                for _, source, log_line in merged_lines(sources):
+                    buffers.put(MERGED_SOURCE, _line_msg(source, log_line.data, mark_restarts), block=True)
+            else:
+                for source in sources:
+                    for log_line in source.lines:
+                        buffers.put(source.log_prefix, _line_msg(source, log_line.data, mark_restarts), block=True)
+            followed = [source.followed for source in sources if source.followed is not None]
+
+            if followed:
+                # All files are followed by a single thread, which only wakes up if any of them changed.
+                def on_lines(file: FollowedFile, new_lines: list[bytes]):
+                    source, line_filter = file.key
+                    if log_filter.active:
+                        new_lines = line_filter.filter(new_lines)
+                    for new_line in new_lines:
+                        buffers.put(source.log_prefix, _line_msg(source, new_line, True))
+
+                follower = LogFollower(followed, on_lines)
+                follower.start()
+                follower.join()
             printer.poisoned = True
             printer.join()
         except KeyboardInterrupt:
             printer.poisoned = True
-            for t in logthreads:
-                t.poisoned = True
+            if follower is not None:
+                follower.poisoned = True
             printer.join(100)
-            for t in logthreads:
-                t.join()
+            if follower is not None:
+                follower.join()
 
 
 def _add_log(
@@ -135,123 +263,276 @@ class LineMsg:
     is_err: bool
 
 
-class Logwatcher(Thread):
-    daemon = True
+@dataclass(slots=True)
+class LogSelection:
+    """The part of the log files to print before following them."""
 
-    poisoned: bool
-    follow: bool
     historic: bool
-    filepath: str
+    # Previous run of the service to start at (0 = current run)
+    run: int | None
+    # Line number to start at (1-based)
+    line: int | None
+    # Only print this many lines from the end
+    lines: int | None
+
+    @property
+    def includes_restarts(self) -> bool:
+        """Whether restart markers can be part of the selected lines."""
+        return self.historic or self.run is not None or self.line is not None
+
+
+class LogLine(NamedTuple):
+    # File the line was read from (the log file or a rotated version of it)
+    path: str
+    # Position of the line in the (decompressed) file
+    offset: int
+    data: bytes
+
+
+@dataclass(slots=True)
+class LogSource:
+    """A log file being read: Its selected lines (read lazily) and the file to follow afterward, if following."""
+
     service: str
     logkey: str
-    msg_queue: SimpleQueue[LineMsg]
+    log_prefix: str
+    log_prefix_color: str
+    lines: Iterator[LogLine]
+    followed: FollowedFile | None
 
-    def __init__(
-        self, follow: bool, historic: bool, filepath: str, service: str, logkey: str, msg_queue: SimpleQueue[LineMsg]
-    ):
-        super().__init__()
-        self.poisoned = False
-        self.follow = follow
-        self.historic = historic
-        self.filepath = filepath
-        self.service = service
-        self.logkey = logkey
-        self.msg_queue = msg_queue
 
-    def run(self):
+def read_log(
+    follow: bool,
+    selection: LogSelection,
+    log_filter: LogFilter,
+    filepath: str,
+    service: str,
+    logkey: str,
+    buffers: LineBuffers[LineMsg],
+) -> LogSource | None:
+    """
+    Opens the log file for reading the selected lines. If following, the followed file is positioned after
+    these lines, once all of them were read. Errors are put into the buffers.
+    """
+    prf = f"{service} {logkey}"
+    prf_col = color_name(prf)
+    try:
+        file = open(filepath, "rb")
         try:
-            prf = f"{self.service} {self.logkey}"
-            prf_col = color_name(prf)
-
-            with open(self.filepath, "r") as file:
-                if self.follow:
-                    # seek ~ 250 characters from the end of the file to print some of the last lines potentially
-                    # I'm aware that this code is not unicode aware, but it's fine.
-                    files_to_read_before_follow = os.path.getsize(self.filepath) - 250
-                    read_characters = 0
-
-                    while True:
-                        newcount = len(file.readline())
-                        read_characters += newcount
-                        if newcount < 1 or read_characters >= files_to_read_before_follow:
-                            break
-
-                if not self.historic:
-                    # Collect all current lines, and if we find any starting STD_LOG_START_MARKER, discard
-                    # all lines before and including that
-                    # If we go through all lines and don't find any STD_LOG_START_MARKER, just print all lines
-                    collected_lines: list[str] = []
-                    while True:
-                        line = file.readline()
-                        if line.startswith(STD_LOG_START_MARKER):
-                            # Discard all lines collected so far, they can't be relevant
-                            collected_lines = []
-                        elif not line:
-                            # EOF
-                            for line in collected_lines:
-                                self.msg_queue.put(
-                                    LineMsg(log_prefix=prf, log_prefix_color=prf_col, msg=line.rstrip(), is_err=False)
-                                )
-                            break
-                        else:
-                            collected_lines.append(line)
-
-                while True:
-                    line = file.readline()
-                    if not line:  # empty string
-                        if not self.follow or self.poisoned:
-                            break  # exit if we aren't following
-                        time.sleep(0.1)
-                        continue
-
-                    # If self.historic, then mark restart messages
-                    if (self.follow or self.historic) and line.startswith(STD_LOG_START_MARKER):
-                        line = "\x1b[1;47;30m" + line
-                    self.msg_queue.put(
-                        LineMsg(log_prefix=prf, log_prefix_color=prf_col, msg=line.rstrip(), is_err=False)
-                    )
+            # Start after the last restart of the service, unless historic, and then only print the last
+            # lines, if limited. Previous runs and line numbers are looked up in the index of the log file.
+            # The last restart (without a valid index) and the last lines are found by searching backwards
+            # from the end of the file.
+            if selection.historic:
+                start = 0
+            elif selection.line is not None:
+                index = log_index(filepath, file, STD_LOG_START_MARKER_BYTES)
+                assert index is not None
+                start = index.line_start(file, selection.line - 1)
+            else:
+                run = selection.run or 0
+                index = log_index(filepath, file, STD_LOG_START_MARKER_BYTES, build=run > 0)
+                start = index.run_start(run) if index is not None else last_marker_end(file, STD_LOG_START_MARKER_BYTES)
+            # With --historic, rotated versions of the log file are read first.
+            rotated = rotated_files(filepath) if selection.historic else []
+            tail_lines = None
+            if selection.lines is not None:
+                tail = start if log_filter.active else tail_start(file, selection.lines, start)
+                if log_filter.active or (rotated and tail == start):
+                    # The last lines can only be found by going through all (matching) lines.
+                    tail_lines = selection.lines
+                else:
+                    start = tail
+                    rotated = []
+        except BaseException:
+            file.close()
+            raise
+    except Exception as exc:
+        buffers.put(prf, _error_msg(prf, prf_col, "", exc), block=True)
+        return None
+
+    line_filter = log_filter.line_filter()
+    followed = FollowedFile(filepath, None, file) if follow else None
+
+    def selected_lines() -> Iterator[LogLine]:
+        for rotated_path in rotated:
+            try:
+                with open_decompressed(rotated_path) as stream:
+                    offset = 0
+                    for line in iter_lines(stream):
+                        yield LogLine(rotated_path, offset, line)
+                        offset += len(line)
+            except Exception as exc:
+                buffers.put(prf, _error_msg(prf, prf_col, f"{os.path.basename(rotated_path)}: ", exc), block=True)
+        file.seek(start)
+        offset = start
+        try:
+            for line in file:
+                if followed is not None and not line.endswith(b"\n"):
+                    # Incomplete last line, printed by the follower once it is complete.
+                    followed.pending = line
+                    break
+                yield LogLine(filepath, offset, line)
+                offset += len(line)
+        finally:
+            # The follower continues where the selected lines end (and detects truncation by this position).
+            if followed is not None:
+                followed.position = file.tell()
+
+    def lines() -> Iterator[LogLine]:
+        try:
+            matching = selected_lines()
+            if log_filter.active:
+                matching = (log_line for log_line in matching if line_filter.accepts(log_line.data))
+            if tail_lines is not None:
+                matching = iter(deque(matching, maxlen=tail_lines))
+            yield from matching
         except Exception as exc:
-            self.msg_queue.put(
-                LineMsg(log_prefix=prf, log_prefix_color=prf_col, msg=f"{exc.__class__.__name__}: {exc}", is_err=True)
-            )
+            buffers.put(prf, _error_msg(prf, prf_col, "", exc), block=True)
+        finally:
+            if followed is None:
+                file.close()
+
+    source = LogSource(service, logkey, prf, prf_col, lines(), followed)
+    if followed is not None:
+        followed.key = (source, line_filter)
+    return source
+
+
+def timed_lines(source: LogSource) -> Iterator[tuple[float, LogSource, LogLine]]:
+    """
+    Yields the lines of the source with their timestamps. Lines without a timestamp have the one of the
+    line before them, -inf if there is none.
+    """
+    last_time = float("-inf")
+    for log_line in source.lines:
+        line_time = detect_time(log_line.data)
+        if line_time is not None:
+            last_time = line_time
+        yield last_time, source, log_line
+
+
+def merged_lines(sources: list[LogSource]) -> Iterator[tuple[float, LogSource, LogLine]]:
+    """Merges the lines of all sources by their timestamps (see timed_lines); the order of each source is kept."""
+    return heapq.merge(*(timed_lines(source) for source in sources), key=lambda entry: entry[0])
+
+
+def _export(ctx: RiptideCliCtx, path: str, sources: list[LogSource], merge: bool):
+    if merge:
+        lines: Iterator[tuple[float, LogSource, LogLine]] = merged_lines(sources)
+    else:
+        lines = itertools.chain.from_iterable(timed_lines(source) for source in sources)
+    with LogExporter(path) as exporter:
+        for line_time, source, log_line in lines:
+            exporter.write(source.service, source.logkey, log_line.path, log_line.offset, line_time, log_line.data)
+    ctx.console.print(f"Exported {exporter.count} lines of {len(sources)} log files to {path}.", highlight=False)
+
+
+def _error_msg(prf: str, prf_col: str, context: str, exc: Exception) -> LineMsg:
+    return LineMsg(
+        log_prefix=prf, log_prefix_color=prf_col, msg=f"{context}{exc.__class__.__name__}: {exc}", is_err=True
+    )
+
+
+def _log_filter(ctx, grep: str | None, since: str | None, until: str | None, level: str | None) -> LogFilter:
+    try:
+        since_time = parse_time(since) if since is not None else None
+        until_time = parse_time(until) if until is not None else None
+    except ValueError as ex:
+        raise RiptideCliError("Invalid time for --since or --until.", ctx) from ex
+    try:
+        return LogFilter(grep=grep, since=since_time, until=until_time, level=level.lower() if level else None)
+    except re.error as ex:
+        raise RiptideCliError(f"Invalid regular expression for --grep: {ex}", ctx) from ex
+
+
+def _line_msg(source: LogSource, line: bytes, mark_restarts: bool) -> LineMsg:
+    msg = line.decode("utf-8", errors="replace").rstrip()
+    # If following or showing previous runs, then mark restart messages
+    if mark_restarts and msg.startswith(STD_LOG_START_MARKER):
+        msg = "\x1b[1;47;30m" + msg
+    return LineMsg(log_prefix=source.log_prefix, log_prefix_color=source.log_prefix_color, msg=msg, is_err=False)
+
+
+def _dropped_msg(source: Hashable, count: int) -> LineMsg:
+    prf = str(source)
+    return LineMsg(
+        log_prefix=prf, log_prefix_color=color_name(prf), msg=f"\x1b[1;33m[{count} lines dropped]", is_err=False
+    )
 
 
 class Printer(Thread):
+    """
+    Prints the lines from the buffers. All lines that are buffered (up to PRINT_BATCH_SIZE) are printed at once.
+    If stdout is not a terminal or no names are shown, the lines are written directly, without rich.
+    """
+
     daemon = True
 
     poisoned: bool
     console_out: Console
     console_err: Console
     prefix_len: int | None
-    msg_queue: SimpleQueue[LineMsg]
+    buffers: LineBuffers[LineMsg]
+    plain: bool
 
     def __init__(
-        self, console_out: Console, console_err: Console, prefix_len: int | None, msg_queue: SimpleQueue[LineMsg]
+        self, console_out: Console, console_err: Console, prefix_len: int | None, buffers: LineBuffers[LineMsg]
     ):
         super().__init__()
         self.poisoned = False
         self.console_out = console_out
         self.console_err = console_err
         self.prefix_len = prefix_len
-        self.msg_queue = msg_queue
+        self.buffers = buffers
+        self.plain = not console_out.is_terminal or prefix_len is None
 
     def run(self):
         while True:
-            while True:
-                try:
-                    msg = self.msg_queue.get(True, 0.5)
-                    break
-                except Empty:
-                    if self.poisoned:
-                        return
-            if msg.is_err:
-                prefix = Text(f"{msg.log_prefix:<{self.prefix_len}}\x1b[0m", style=msg.log_prefix_color)
-                self.console_err.print(prefix + Text(f"❌ Error: {msg.msg}", style=Style(color="white", bgcolor="red")))
-            else:
+            batch = self.buffers.get_batch(PRINT_BATCH_SIZE, 0.5)
+            if not batch:
+                if self.poisoned:
+                    return
+                continue
+
+            lines: list[LineMsg] = []
+            for msg in batch:
+                if msg.is_err:
+                    self._flush(lines)
+                    lines = []
+                    prefix = Text(f"{msg.log_prefix:<{self.prefix_len or 0}}\x1b[0m", style=msg.log_prefix_color)
+                    self.console_err.print(
+                        prefix + Text(f"❌ Error: {msg.msg}", style=Style(color="white", bgcolor="red"))
+                    )
+                else:
+                    lines.append(msg)
+            self._flush(lines)
+
+    def _flush(self, lines: list[LineMsg]):
+        if not lines:
+            return
+        if self.plain:
+            is_terminal = self.console_out.is_terminal
+            out = []
+            for msg in lines:
+                if self.prefix_len is not None:
+                    out.append(f"{msg.log_prefix:<{self.prefix_len}}| ")
+                if is_terminal:
+                    # Reset the style of the line after it, in case it contains escape sequences.
+                    out.append(msg.msg + "\x1b[0m\n" if "\x1b" in msg.msg else msg.msg + "\n")
+                else:
+                    out.append(ANSI_ESCAPE.sub("", msg.msg) + "\n")
+            sys.stdout.write("".join(out))
+            sys.stdout.flush()
+        else:
+            text = Text()
+            for i, msg in enumerate(lines):
+                if i > 0:
+                    text.append("\n")
                 if self.prefix_len is not None:
-                    prefix = Text(f"{msg.log_prefix:<{self.prefix_len}}| ", style=msg.log_prefix_color)
-                    self.console_out.print(prefix, end="")
-            self.console_out.print(Text.from_ansi(msg.msg), no_wrap=True, overflow="ignore", crop=False)
+                    text.append(f"{msg.log_prefix:<{self.prefix_len}}| ", style=msg.log_prefix_color)
+                text.append_text(Text.from_ansi(msg.msg))
+            self.console_out.print(text, no_wrap=True, overflow="ignore", crop=False)
 
 
 def color_name(text: str) -> str:
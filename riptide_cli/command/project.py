@@ -27,13 +27,21 @@ from riptide_cli.helpers import (
     rule,
     warn,
 )
-from riptide_cli.lifecycle import start_project, status_project, stop_project
+from riptide_cli.lifecycle import (
+    start_project,
+    status_project,
+    status_project_structured,
+    status_project_watch,
+    stop_project,
+)
 from riptide_cli.loader import (
     RiptideCliCtx,
     cmd_constraint_project_loaded,
     load_riptide_core,
 )
+from riptide_cli.output import FORMAT_TEXT, format_option, print_structured
 from riptide_cli.setup_assistant import setup_assistant
+from riptide_cli.status import status_collector
 from setproctitle import setproctitle
 
 
@@ -56,14 +64,31 @@ def load(main):
 
     @cli_section("Service")
     @main.command(CMD_STATUS)
+    @click.option("--watch", "-w", is_flag=True, help="Keep the status updated until interrupted.")
+    @click.option(
+        "--interval",
+        "-n",
+        type=click.FloatRange(min=0.1),
+        default=2.0,
+        show_default=True,
+        help="With --watch: Seconds between status updates of services that recently changed.",
+    )
+    @format_option
     @click.pass_context
-    def status(ctx):
+    def status(ctx, watch: bool, interval: float, output_format: str):
         """
         Outputs the current status.
         This includes the status of the current project (if any is loaded) and all services of that project.
         """
         load_riptide_core(ctx)
-        status_project(ctx)
+        if output_format != FORMAT_TEXT:
+            if watch:
+                raise RiptideCliError("--watch can not be used with --format.", ctx)
+            status_project_structured(ctx, output_format)
+        elif watch:
+            status_project_watch(ctx, interval=interval)
+        else:
+            status_project(ctx)
 
     @cli_section("Service")
     @main.command(CMD_START)
@@ -280,7 +305,7 @@ def load(main):
         project = ctx.system_config["project"]
 
         # Get running services:
-        running_services = [k for (k, v) in ctx.engine.status(project).items() if v]
+        running_services = [k for (k, v) in status_collector(ctx).collect().items() if v and v.running]
         # Default (running services):
         services_to_restart = running_services
         if default and "default_services" in project:
@@ -321,13 +346,15 @@ def load(main):
     @main.command(
         CMD_CMD,
         context_settings={
-            "ignore_unknown_options": True  # Make all unknown options redirect to arguments
+            "ignore_unknown_options": True,  # Make all unknown options redirect to arguments
+            "allow_interspersed_args": False,  # Options after the command name are arguments of the command
         },
     )
     @click.pass_context
+    @format_option
     @click.argument("command", required=False)
     @click.argument("arguments", required=False, nargs=-1, type=click.UNPROCESSED)
-    def cmd(ctx, command, arguments):
+    def cmd(ctx, command, arguments, output_format: str):
         """
         Executes a project command.
         Project commands are specified in the project configuration.
@@ -344,6 +371,15 @@ def load(main):
         project = ctx.system_config["project"]
         engine = ctx.engine
 
+        if command is None and output_format != FORMAT_TEXT:
+            commands = project["app"]["commands"] if "commands" in project["app"] else {}
+            entries = [
+                {"command": name, "alias_for": cmd["aliases"] if "aliases" in cmd else None}
+                for name, cmd in sorted(commands.items())
+            ]
+            print_structured(output_format, {"commands": entries}, entries)
+            return
+
         if command is None:
             if "commands" not in project["app"] or len(project["app"]["commands"]) < 1:
                 ctx.console.print("No commands defined.")
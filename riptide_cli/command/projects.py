@@ -3,6 +3,8 @@ from rich.tree import Tree
 from riptide.config.loader import load_projects, remove_project
 from riptide_cli.command.constants import CMD_PROJECT_LIST, CMD_PROJECT_REMOVE
 from riptide_cli.helpers import RiptideCliError, cli_section
+from riptide_cli.output import FORMAT_TEXT, format_option, print_structured
+from riptide_cli.shell_integration import update_project_index
 
 
 def load(main):
@@ -10,14 +12,19 @@ def load(main):
 
     @cli_section("Project")
     @main.command(CMD_PROJECT_LIST)
+    @format_option
     @click.pass_context
-    def list(ctx):
+    def list(ctx, output_format: str):
         """
         Lists projects.
         This includes all projects that were ever loaded with Riptide.
         """
-        pr_tree = Tree("Projects")
         projects = load_projects(True)
+        if output_format != FORMAT_TEXT:
+            entries = [{"name": name, "path": path} for name, path in projects.items()]
+            print_structured(output_format, {"projects": entries}, entries)
+            return
+        pr_tree = Tree("Projects")
         for name, path in projects.items():
             pr_tree.add(f"[bold]{name}[/]: {path}")
         ctx.parent.console.print(pr_tree)
@@ -42,4 +49,5 @@ def load(main):
         if project not in projects:
             raise RiptideCliError(f"Project {project} not found.", ctx)
         remove_project(project)
+        update_project_index()
         ctx.parent.console.print(f"Project {project} removed.")
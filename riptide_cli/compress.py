@@ -0,0 +1,306 @@
+"""
+Reading and writing compressed files.
+
+gzip, bzip2 and xz are supported with the standard library. zstd is supported with the standard library on
+Python 3.14+, otherwise with the ``zstandard`` package, if installed, or the ``zstd`` command line tool.
+
+Large files can be (de)compressed in a separate process instead, with (multi-threaded, where possible) command
+line tools like pigz, if installed.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import shutil
+import subprocess
+from collections.abc import Iterator
+from threading import Thread
+from typing import IO, BinaryIO, cast
+
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+COMPRESSION_BZIP2 = "bzip2"
+COMPRESSION_XZ = "xz"
+
+EXTENSIONS = {
+    ".gz": COMPRESSION_GZIP,
+    ".zst": COMPRESSION_ZSTD,
+    ".bz2": COMPRESSION_BZIP2,
+    ".xz": COMPRESSION_XZ,
+}
+MAGIC_BYTES = {
+    b"\x1f\x8b": COMPRESSION_GZIP,
+    b"\x28\xb5\x2f\xfd": COMPRESSION_ZSTD,
+    b"BZh": COMPRESSION_BZIP2,
+    b"\xfd7zXZ\x00": COMPRESSION_XZ,
+}
+# Command line tools to decompress to stdout, in order of preference.
+DECOMPRESS_COMMANDS = {
+    COMPRESSION_GZIP: [["pigz", "-d", "-c"]],
+    COMPRESSION_ZSTD: [["zstd", "-d", "-c", "-q"]],
+    COMPRESSION_BZIP2: [["lbzip2", "-d", "-c"], ["pbzip2", "-d", "-c"]],
+    COMPRESSION_XZ: [["xz", "-d", "-c", "-T0"]],
+}
+# Command line tools to compress to stdout, in order of preference.
+COMPRESS_COMMANDS = {
+    COMPRESSION_GZIP: [["pigz", "-c"]],
+    COMPRESSION_ZSTD: [["zstd", "-c", "-q", "-T0"]],
+    COMPRESSION_BZIP2: [["lbzip2", "-c"], ["pbzip2", "-c"]],
+    COMPRESSION_XZ: [["xz", "-c", "-T0"]],
+}
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class CompressionNotSupportedError(Exception):
+    pass
+
+
+def compression_for_path(path: str) -> str | None:
+    """Returns the compression of the file based on its extension, None if it is not compressed."""
+    for extension, compression in EXTENSIONS.items():
+        if path.endswith(extension):
+            return compression
+    return None
+
+
+def detect_compression(path: str) -> str | None:
+    """Returns the compression of the file based on its content, None if it is not compressed."""
+    with open(path, "rb") as file:
+        start = file.read(max(len(magic) for magic in MAGIC_BYTES))
+    for magic, compression in MAGIC_BYTES.items():
+        if start.startswith(magic):
+            return compression
+    return None
+
+
+def open_decompressed(path: str) -> BinaryIO:
+    """Opens the file for reading; compressed files (based on the extension) are decompressed while reading."""
+    compression = compression_for_path(path)
+    file = open(path, "rb")
+    if compression is None:
+        return file
+    try:
+        return decompressing_reader(file, compression)
+    except BaseException:
+        file.close()
+        raise
+
+
+def decompressing_reader(file: BinaryIO, compression: str, process: bool = False) -> BinaryIO:
+    """
+    Returns a stream with the decompressed content of the file. Closing it closes the file.
+    If process is true, the file is decompressed in a separate process, if a command for it is installed.
+    """
+    if process:
+        for args in DECOMPRESS_COMMANDS.get(compression, []):
+            if shutil.which(args[0]):
+                return cast(BinaryIO, _ProcessReader(args, file))
+    if compression == COMPRESSION_GZIP:
+        return _closing(gzip.GzipFile(fileobj=file, mode="rb"), file)
+    if compression == COMPRESSION_BZIP2:
+        return _closing(bz2.BZ2File(file, "rb"), file)
+    if compression == COMPRESSION_XZ:
+        return _closing(lzma.LZMAFile(file, "rb"), file)
+    if compression == COMPRESSION_ZSTD:
+        return _zstd_reader(file)
+    raise CompressionNotSupportedError(f"Unknown compression: {compression}")
+
+
+def open_compressed_writer(path: str) -> BinaryIO:
+    """Opens the file for writing; it is compressed based on the extension of the path."""
+    compression = compression_for_path(path)
+    file = open(path, "wb")
+    if compression is None:
+        return file
+    try:
+        return compressing_writer(file, compression)
+    except BaseException:
+        file.close()
+        raise
+
+
+def compressing_writer(file: BinaryIO, compression: str, process: bool = False) -> BinaryIO:
+    """
+    Returns a stream that writes the compressed data to the file. Closing it closes the file.
+    If process is true, the data is compressed in a separate process, if a command for it is installed.
+    """
+    if process:
+        for args in COMPRESS_COMMANDS.get(compression, []):
+            if shutil.which(args[0]):
+                return cast(BinaryIO, _ProcessWriter(args, file))
+    if compression == COMPRESSION_GZIP:
+        return _closing(gzip.GzipFile(fileobj=file, mode="wb", compresslevel=6), file)
+    if compression == COMPRESSION_BZIP2:
+        return _closing(bz2.BZ2File(file, "wb"), file)
+    if compression == COMPRESSION_XZ:
+        return _closing(lzma.LZMAFile(file, "wb"), file)
+    if compression == COMPRESSION_ZSTD:
+        return _zstd_writer(file)
+    raise CompressionNotSupportedError(f"Unknown compression: {compression}")
+
+
+def iter_lines(stream: IO[bytes]) -> Iterator[bytes]:
+    """Yields the lines of the stream, including the line breaks. Only uses read()."""
+    rest = b""
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line + b"\n"
+    if rest:
+        yield rest
+
+
+def _zstd_reader(file: BinaryIO) -> BinaryIO:
+    try:
+        from compression import zstd  # type: ignore
+
+        return zstd.ZstdFile(file, "rb")
+    except ImportError:
+        pass
+    try:
+        import zstandard  # type: ignore
+
+        return zstandard.ZstdDecompressor().stream_reader(file, read_across_frames=True, closefd=True)
+    except ImportError:
+        pass
+    if shutil.which("zstd"):
+        return cast(BinaryIO, _ProcessReader(["zstd", "-d", "-c", "-q"], file))
+    raise CompressionNotSupportedError(
+        "Reading zstd compressed files requires Python 3.14, the zstandard package or the zstd command."
+    )
+
+
+def _zstd_writer(file: BinaryIO) -> BinaryIO:
+    try:
+        from compression import zstd  # type: ignore
+
+        return zstd.ZstdFile(file, "wb")
+    except ImportError:
+        pass
+    try:
+        import zstandard  # type: ignore
+
+        return zstandard.ZstdCompressor().stream_writer(file, closefd=True)
+    except ImportError:
+        pass
+    if shutil.which("zstd"):
+        return cast(BinaryIO, _ProcessWriter(["zstd", "-c", "-q"], file))
+    raise CompressionNotSupportedError(
+        "Writing zstd compressed files requires Python 3.14, the zstandard package or the zstd command."
+    )
+
+
+def _closing(stream: io.BufferedIOBase, file: BinaryIO) -> BinaryIO:
+    return cast(BinaryIO, _Closing(stream, file))
+
+
+class _Closing:
+    """Closes the file after the stream (the standard library streams don't close files they did not open)."""
+
+    def __init__(self, stream: io.BufferedIOBase, file: BinaryIO):
+        self.stream = stream
+        self.file = file
+
+    def read(self, size: int = -1) -> bytes:
+        return self.stream.read(size)
+
+    def write(self, data: bytes) -> int:
+        return self.stream.write(data)
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _ProcessWriter:
+    """
+    Input of a process that writes to the file on stdout. If the file is no real file (has no fileno), the
+    output is copied to it by a thread.
+    """
+
+    def __init__(self, args: list[str], file: BinaryIO):
+        self.name = args[0]
+        self.file = file
+        self.copy_error: BaseException | None = None
+        self.copy_thread: Thread | None = None
+        if hasattr(file, "fileno"):
+            self.process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=file)
+        else:
+            self.process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self.copy_thread = Thread(target=self._copy_output, daemon=True)
+            self.copy_thread.start()
+        assert self.process.stdin is not None
+        self.stdin = self.process.stdin
+
+    def _copy_output(self):
+        assert self.process.stdout is not None
+        try:
+            shutil.copyfileobj(self.process.stdout, self.file, READ_CHUNK_SIZE)
+        except BaseException as ex:
+            self.copy_error = ex
+            # Let the process fail instead of blocking
+            self.process.stdout.close()
+
+    def write(self, data: bytes) -> int:
+        return self.stdin.write(data)
+
+    def close(self):
+        try:
+            self.stdin.close()
+            if self.process.wait() != 0 and self.copy_error is None:
+                raise OSError(f"{self.name} failed with exit code {self.process.returncode}.")
+            if self.copy_thread is not None:
+                self.copy_thread.join()
+            if self.copy_error is not None:
+                raise self.copy_error
+        finally:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _ProcessReader:
+    """Output of a process that reads the file on stdin."""
+
+    def __init__(self, args: list[str], file: BinaryIO):
+        self.name = args[0]
+        self.file = file
+        self.process = subprocess.Popen(args, stdin=file, stdout=subprocess.PIPE)
+        assert self.process.stdout is not None
+        self.stdout = self.process.stdout
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stdout.read(size)
+        if not data and size != 0 and self.process.wait() != 0:
+            raise OSError(f"{self.name} failed with exit code {self.process.returncode}.")
+        return data
+
+    def close(self):
+        self.stdout.close()
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,225 @@
+"""
+On-disk cache of the merged and resolved system and project configuration.
+
+Loading the configuration requires reading and merging all documents referenced from the repositories and
+processing all variables. The final document is stored (pickled) in the cache directory and re-used as long as
+none of the files that contributed to it changed.
+
+Long running processes (the daemon, see riptide_cli.daemon) can additionally keep the loaded configurations in
+memory, see enable_memory_cache.
+
+Caching can be disabled by setting the environment variable ``RIPTIDE_DONT_CACHE_CONFIG``.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import os
+import pickle
+import tempfile
+from collections.abc import Iterator
+from typing import Any
+
+import riptide.config.loader
+from configcrunch import YamlConfigDocument
+from riptide.config.document.config import Config
+from riptide.config.document.project import Project
+from riptide.config.files import (
+    discover_project_file,
+    remove_all_special_chars,
+    riptide_config_dir,
+    riptide_local_repositories_path,
+    riptide_main_config_file,
+    riptide_projects_file,
+)
+from riptide.config.loader import LOCAL_PROJECT_FILENAME, load_config
+from riptide.plugin.loader import load_plugins
+from riptide.util import get_riptide_version_raw
+
+ENV_DONT_CACHE_CONFIG = "RIPTIDE_DONT_CACHE_CONFIG"
+# Increase if the format of the cache files changes.
+CACHE_VERSION = 1
+# Documents using this helper can change without any file changing; they are never cached.
+UNCACHEABLE_NEEDLE = b"get_plugin_flag"
+
+FileStat = tuple[int, int] | None
+
+# Loaded configurations by cache file, together with the cache entry describing them. None if disabled.
+_memory_cache: dict[str, tuple[dict[str, Any], Config]] | None = None
+
+
+def enable_memory_cache():
+    """Keep loaded configurations in memory, in addition to the cache on disk."""
+    global _memory_cache
+    if _memory_cache is None:
+        _memory_cache = {}
+
+
+def load_config_cached(project_file: str | None = None, skip_project_load=False) -> Config:
+    """
+    Like riptide.config.loader.load_config, but re-uses the last loaded configuration, if none of the files
+    it was loaded from changed.
+    :param project_file:        Project file to load or None for auto-discovery
+    :param skip_project_load:   Skip project loading. If True, the project_file setting will be ignored
+    """
+    if ENV_DONT_CACHE_CONFIG in os.environ:
+        return load_config(project_file, skip_project_load=skip_project_load)
+
+    project_path = None
+    if not skip_project_load:
+        project_path = project_file if project_file else discover_project_file()
+        if project_path is not None:
+            project_path = os.path.abspath(project_path)
+
+    cache_file = _cache_file_path(project_path)
+    system_config = None
+    cached = None
+    if _memory_cache is not None and cache_file in _memory_cache:
+        cached, system_config = _memory_cache[cache_file]
+        if not _is_fresh(cached, project_path):
+            system_config = None
+    if system_config is None:
+        cached, system_config = _read_cache(cache_file, project_path)
+    if system_config is not None:
+        if _memory_cache is not None and cached is not None:
+            _memory_cache[cache_file] = (cached, system_config)
+        for plugin in load_plugins().values():
+            plugin.after_reload_config(system_config)
+        return system_config
+
+    system_config = load_config(project_file, skip_project_load=skip_project_load)
+    cached = _write_cache(cache_file, project_path, system_config)
+    if _memory_cache is not None and cached is not None:
+        _memory_cache[cache_file] = (cached, system_config)
+    return system_config
+
+
+def _cache_file_path(project_path: str | None) -> str:
+    name = "system" if project_path is None else hashlib.sha1(project_path.encode()).hexdigest()
+    return os.path.join(riptide_config_dir(), "cache", f"config-{name}.pickle")
+
+
+def _meta(project_path: str | None) -> tuple[Any, ...]:
+    """Everything besides files that influences the resolved configuration."""
+    return (
+        CACHE_VERSION,
+        get_riptide_version_raw(),
+        project_path,
+        os.getuid() if hasattr(os, "getuid") else None,
+        os.getgid() if hasattr(os, "getgid") else None,
+        tempfile.gettempdir(),
+    )
+
+
+def _stat(path: str) -> FileStat:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _documents(obj: Any) -> Iterator[YamlConfigDocument]:
+    """Yields the document and all of its sub-documents recursively."""
+    if isinstance(obj, YamlConfigDocument):
+        yield obj
+        obj = obj.doc
+    if isinstance(obj, dict):
+        for value in obj.values():
+            yield from _documents(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from _documents(value)
+
+
+def _contributing_files(system_config: Config, project_path: str | None) -> list[str]:
+    """Returns the paths of all files that contributed to the final configuration (or could, if created)."""
+    files = [riptide_main_config_file(), riptide_projects_file()]
+    if project_path is not None:
+        files.append(project_path)
+        files.append(os.path.join(os.path.dirname(project_path), LOCAL_PROJECT_FILENAME))
+    for document in _documents(system_config):
+        for path in document.absolute_paths:
+            # References are stored without the file extension.
+            files.append(path)
+            files.append(path + ".yml")
+    # Repositories updates (riptide update) always modify the git index.
+    for repo in system_config["repos"]:
+        repo_path = os.path.join(riptide_local_repositories_path(), remove_all_special_chars(repo))
+        files.append(repo_path)
+        files.append(os.path.join(repo_path, ".git", "index"))
+    return list(dict.fromkeys(files))
+
+
+def _rebuild(doc: dict, project_path: str | None) -> Config:
+    """Re-creates the configuration from the dict of an already merged and resolved configuration."""
+    doc = doc[Config.header()].copy()
+    project_doc = doc.pop("project", None)
+
+    system_config = Config.from_dict(doc)
+    system_config.resolve_and_merge_references([])
+    system_config.validate()
+
+    try:
+        if project_doc is not None:
+            riptide.config.loader.CURRENTLY_LOADING_PROJECT_PATH = project_path
+            project_config = Project.from_dict(project_doc)
+            project_config.resolve_and_merge_references([])
+            system_config.internal_set("project", project_config)
+            project_config.parent_doc = system_config
+
+        system_config.process_vars()
+        system_config.validate()
+        system_config.freeze()
+        return system_config
+    finally:
+        riptide.config.loader.CURRENTLY_LOADING_PROJECT_PATH = None
+
+
+def _is_fresh(cached: dict[str, Any], project_path: str | None) -> bool:
+    """Whether the cache entry still describes the configuration, meaning none of its files changed."""
+    if cached["meta"] != _meta(project_path):
+        return False
+    return all(_stat(path) == stat for path, stat in cached["files"].items())
+
+
+def _read_cache(cache_file: str, project_path: str | None) -> tuple[dict[str, Any] | None, Config | None]:
+    try:
+        with open(cache_file, "rb") as f:
+            cached = pickle.load(f)
+        if not _is_fresh(cached, project_path):
+            return None, None
+        return cached, _rebuild(cached["doc"], project_path)
+    except Exception:
+        # Missing, outdated or broken cache, the configuration is loaded normally.
+        return None, None
+
+
+def _write_cache(cache_file: str, project_path: str | None, system_config: Config) -> dict[str, Any] | None:
+    """Writes the configuration to the cache. Returns the cache entry or None, if it can not be cached."""
+    doc = system_config.to_dict()
+    files = _contributing_files(system_config, project_path)
+
+    for path in files:
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                if UNCACHEABLE_NEEDLE in f.read():
+                    return None
+
+    # Only cache configurations that can be restored without any differences.
+    try:
+        if _rebuild(copy.deepcopy(doc), project_path).to_dict() != doc:
+            return None
+    except Exception:
+        return None
+
+    cached = {"meta": _meta(project_path), "files": {path: _stat(path) for path in files}, "doc": doc}
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=os.path.dirname(cache_file), delete=False) as tmp_file:
+            pickle.dump(cached, tmp_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file.name, cache_file)
+    except OSError:
+        pass
+    return cached
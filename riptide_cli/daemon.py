@@ -0,0 +1,234 @@
+"""
+Optional per-user daemon that keeps the CLI "warm".
+
+Starting the Riptide CLI requires importing a lot of modules and loading the configuration. The daemon does this
+once and then waits for invocations of ``riptide`` or of command aliases on a Unix socket (see riptide_cli.client).
+Every invocation is run in a process forked from the daemon, so it starts with everything already loaded. The
+client passes its standard streams, working directory and environment, and the process behaves as if it was
+started by the client directly.
+
+The daemon keeps the configuration of the projects it was used for in memory, it is re-used as long as none of the
+files it was loaded from changed (see riptide_cli.config_cache). Engines are only imported: The connections of an
+engine can not be safely shared between forked processes, so every invocation still creates its own.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import traceback
+from importlib.metadata import entry_points
+from typing import Any
+
+from riptide.config.files import riptide_config_dir
+from riptide_cli.client import _HEADER, _RESULT, build_id, daemon_socket_path
+
+DAEMON_PID_FILE_NAME = "daemon.pid"
+# The daemon stops after not being used for this long (in seconds).
+DEFAULT_IDLE_TIMEOUT = 60 * 60
+# Maximum time a client may take to send its request (in seconds).
+REQUEST_TIMEOUT = 10
+# Options of the CLI that select a project. If given, the project configuration is not pre-loaded by the daemon.
+PROJECT_OPTIONS = ("-P", "--project", "-p", "--project-file")
+
+
+def daemon_pid_file_path() -> str:
+    return os.path.join(riptide_config_dir(), DAEMON_PID_FILE_NAME)
+
+
+def running_daemon_pid() -> int | None:
+    """Returns the pid of the running daemon or None, if no daemon is running."""
+    try:
+        with open(daemon_pid_file_path()) as f:
+            pid = int(f.read().strip())
+        os.kill(pid, 0)
+    except (OSError, ValueError):
+        return None
+    if not os.path.exists(daemon_socket_path()):
+        return None
+    return pid
+
+
+def serve(idle_timeout: float | None = DEFAULT_IDLE_TIMEOUT):
+    """Runs the daemon in the current process, until it is stopped or was idle for idle_timeout seconds."""
+    _warm_up()
+    started_build = build_id()
+
+    socket_path = daemon_socket_path()
+    pid_file_path = daemon_pid_file_path()
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    try:
+        os.unlink(socket_path)
+    except FileNotFoundError:
+        pass
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    server.listen()
+    server.settimeout(idle_timeout)
+    with open(pid_file_path, "w") as f:
+        f.write(str(os.getpid()))
+
+    # Finished invocations are reaped automatically.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda _sig, _frame: sys.exit(0))
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except TimeoutError:
+                break
+            with conn:
+                _handle(conn, server)
+            if build_id() != started_build:
+                # The CLI was updated, this daemon is outdated.
+                break
+    finally:
+        server.close()
+        # Only clean up, if no other daemon replaced this one in the meantime.
+        try:
+            with open(pid_file_path) as f:
+                if f.read().strip() == str(os.getpid()):
+                    os.unlink(pid_file_path)
+                    os.unlink(socket_path)
+        except OSError:
+            pass
+
+
+def _warm_up():
+    """Imports and loads everything invocations may need."""
+    import click
+    from riptide.db.driver.db_driver_for_service import DB_DRIVER_ENTRYPOINT_KEY
+    from riptide.engine.loader import ENGINE_ENTRYPOINT_KEY
+    from riptide_cli import config_cache
+    from riptide_cli.__main__ import cli
+
+    # Loads all commands and plugins.
+    cli.list_commands(click.Context(cli))
+    for group in (ENGINE_ENTRYPOINT_KEY, DB_DRIVER_ENTRYPOINT_KEY):
+        for entry_point in entry_points().select(group=group):
+            try:
+                entry_point.load()
+            except Exception:
+                pass
+    config_cache.enable_memory_cache()
+
+
+def _handle(conn: socket.socket, server: socket.socket):
+    """Handles a single invocation."""
+    conn.settimeout(REQUEST_TIMEOUT)
+    fds: list[int] = []
+    try:
+        request, fds = _recv_request(conn)
+        if request.get("build") != build_id() or len(fds) != 3:
+            # Different installation of the CLI, the client runs the invocation itself.
+            conn.sendall(_RESULT.pack(0))
+            return
+        _preload(request)
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        if os.fork() == 0:
+            server.close()
+            _run_forked(conn, request, fds)
+    except (OSError, ValueError):
+        pass
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+
+def _recv_request(conn: socket.socket) -> tuple[dict[str, Any], list[int]]:
+    data, fds, _flags, _addr = socket.recv_fds(conn, 64 * 1024, 3)
+    if len(data) < _HEADER.size:
+        raise ValueError("Invalid request.")
+    (length,) = _HEADER.unpack(data[: _HEADER.size])
+    data = data[_HEADER.size :]
+    while len(data) < length:
+        chunk = conn.recv(length - len(data))
+        if not chunk:
+            raise ValueError("Incomplete request.")
+        data += chunk
+    return json.loads(data), fds
+
+
+def _preload(request: dict[str, Any]):
+    """Loads the configuration of the project the invocation is for, so forked processes can re-use it."""
+    if any(arg.split("=")[0] in PROJECT_OPTIONS for arg in request["args"]):
+        return
+    from riptide_cli.config_cache import load_config_cached
+
+    cwd = os.getcwd()
+    try:
+        os.chdir(request["cwd"])
+        load_config_cached()
+    except Exception:
+        # The invocation will load (and report errors for) the configuration itself.
+        pass
+    finally:
+        os.chdir(cwd)
+
+
+def _run_forked(conn: socket.socket, request: dict[str, Any], fds: list[int]):
+    """Runs the invocation in the forked process and reports the exit code to the client. Never returns."""
+    exit_code = 1
+    try:
+        conn.sendall(_RESULT.pack(os.getpid()))
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+        sys.stdout.reconfigure(line_buffering=sys.stdout.isatty())  # type: ignore
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        tempfile.tempdir = None
+
+        exit_code = _run(request)
+    except SystemExit as ex:
+        exit_code = _exit_code(ex.code)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            conn.sendall(_RESULT.pack(exit_code))
+        except Exception:
+            pass
+        os._exit(0)
+
+
+def _run(request: dict[str, Any]) -> int:
+    if request["type"] == "cmd":
+        from riptide_cli.shell_integration import run_cmd
+
+        run_cmd(request["command"], request["args"])
+    else:
+        from riptide_cli.__main__ import cli
+
+        cli.main(args=request["args"], prog_name="riptide")
+    return 0
+
+
+def _exit_code(code: Any) -> int:
+    """Converts the code of a SystemExit to an exit code, like the interpreter does."""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    # Started by the daemon-start command. Optional argument: Idle timeout in seconds, 0 to never stop.
+    timeout = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_IDLE_TIMEOUT
+    serve(timeout if timeout > 0 else None)
@@ -0,0 +1,161 @@
+"""
+Disk usage and last use of database environments.
+
+The size (on disk) and number of files of an environment are computed by walking its data directory. The totals
+of each directory are cached (in ``_riptide/.db_usage.json``) together with its modification time and re-used
+as long as that did not change. Only inactive environments use the cache: The running database writes to
+the files of the active environment at any time, which does not change the modification times of directories.
+
+The last use of an environment is the latest of: When it was last switched to or away from (see record_use),
+the modification time of its newest file and, for the active environment, now.
+
+Environments stored in named volumes (performance option ``dont_sync_named_volumes_with_host``) can not be
+walked, their size and number of files are unknown.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from riptide.config.files import get_project_meta_folder
+from riptide.db.environments import DbEnvironments
+from riptide.db.impl.data_directory import DataDirectoryDbEnvImpl
+from riptide_cli.clone import environment_path
+
+USAGE_FILE_NAME = ".db_usage.json"
+USAGE_VERSION = 1
+
+
+@dataclass
+class EnvUsage:
+    size: int | None
+    files: int | None
+    last_used: float | None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"size": self.size, "files": self.files, "last_used": self.last_used}
+
+
+class DbUsage:
+    """Usage of the database environments of a project. Call save to store the cache after using it."""
+
+    def __init__(self, dbenv: DbEnvironments):
+        self.dbenv = dbenv
+        self.path = os.path.join(get_project_meta_folder(dbenv.project.folder()), USAGE_FILE_NAME)
+        self.last_used: dict[str, float] = {}
+        # For each environment: Totals of each directory (by path relative to the environment)
+        self.scans: dict[str, dict[str, dict[str, Any]]] = {}
+        self.changed = False
+        self._load()
+
+    def usage(self, name: str) -> EnvUsage:
+        active = name == self.dbenv.currently_selected_name()
+        size = files = None
+        newest = None
+        if isinstance(self.dbenv.impl, DataDirectoryDbEnvImpl):
+            path = environment_path(self.dbenv, name)
+            if os.path.isdir(path):
+                scan: dict[str, dict[str, Any]] = {}
+                size, files, newest = _walk(path, "", {} if active else self.scans.get(name, {}), scan)
+                if active:
+                    self.changed |= self.scans.pop(name, None) is not None
+                elif scan != self.scans.get(name):
+                    self.scans[name] = scan
+                    self.changed = True
+        candidates = [t for t in (self.last_used.get(name), newest, time.time() if active else None) if t is not None]
+        return EnvUsage(size=size, files=files, last_used=max(candidates) if candidates else None)
+
+    def record_use(self, *names: str):
+        """Records that the environments are used (switched to or away from) now."""
+        now = time.time()
+        for name in names:
+            self.last_used[name] = now
+        self.changed = True
+
+    def forget(self, name: str):
+        """Removes everything known about a (deleted) environment."""
+        self.last_used.pop(name, None)
+        self.scans.pop(name, None)
+        self.changed = True
+
+    def _load(self):
+        try:
+            with open(self.path) as fp:
+                data = json.load(fp)
+            if data.get("version") == USAGE_VERSION:
+                self.last_used = data["last_used"]
+                self.scans = data["scans"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def save(self):
+        if not self.changed:
+            return
+        data = {"version": USAGE_VERSION, "last_used": self.last_used, "scans": self.scans}
+        try:
+            with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(self.path), delete=False) as tmp_file:
+                json.dump(data, tmp_file)
+            os.replace(tmp_file.name, self.path)
+            self.changed = False
+        except OSError:
+            pass
+
+
+def _walk(
+    root: str, rel: str, cached: dict[str, dict[str, Any]], scan: dict[str, dict[str, Any]]
+) -> tuple[int, int, float | None]:
+    """
+    Returns the size, number of files and the modification time of the newest file in the directory and all
+    directories below it. The totals of each directory are added to scan; cached ones are used, if up to date.
+    Directories that can not be read count as empty.
+    """
+    path = os.path.join(root, rel)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return 0, 0, None
+    entry = cached.get(rel)
+    if entry is None or entry["mtime"] != mtime:
+        entry = {"mtime": mtime, "size": 0, "files": 0, "newest": None, "dirs": []}
+        try:
+            with os.scandir(path) as entries:
+                for dir_entry in entries:
+                    try:
+                        if dir_entry.is_dir(follow_symlinks=False):
+                            entry["dirs"].append(dir_entry.name)
+                            continue
+                        st = dir_entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    # Allocated size, like du; not available on Windows.
+                    entry["size"] += st.st_blocks * 512 if hasattr(st, "st_blocks") else st.st_size
+                    entry["files"] += 1
+                    entry["newest"] = max(entry["newest"] or st.st_mtime, st.st_mtime)
+        except OSError:
+            pass
+    scan[rel] = entry
+    size, files, newest = entry["size"], entry["files"], entry["newest"]
+    for name in entry["dirs"]:
+        sub_size, sub_files, sub_newest = _walk(root, os.path.join(rel, name), cached, scan)
+        size += sub_size
+        files += sub_files
+        if sub_newest is not None:
+            newest = max(newest or sub_newest, sub_newest)
+    return size, files, newest
+
+
+def format_ago(timestamp: float | None, now: float | None = None) -> str:
+    """Describes how long ago the timestamp was, e.g. "3 days ago"."""
+    if timestamp is None:
+        return "unknown"
+    seconds = (now or time.time()) - timestamp
+    for unit, length in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= length:
+            count = int(seconds // length)
+            return f"{count} {unit}{'s' if count != 1 else ''} ago"
+    return "just now"
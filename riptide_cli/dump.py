@@ -0,0 +1,256 @@
+"""
+Importing and exporting compressed database dumps.
+
+The compression of dumps is detected by their magic bytes (see riptide_cli.compress). Compressed dumps are
+decompressed while they are imported: The decompressed dump is written to a named pipe, which is passed to the
+database driver in place of the dump, so decompressing and importing overlap and no disk space is needed for the
+decompressed dump. The same way, exports are read from a named pipe and compressed and/or split into chunks while
+the driver writes them. Dumps are (de)compressed in a separate process, with pigz, zstd, etc., if installed.
+
+Named pipes can only be passed to containers on Linux. Elsewhere, or if the driver fails without opening the
+pipe (for example because it expects a regular file), the dump is decompressed into or exported to a temporary
+file first.
+"""
+
+from __future__ import annotations
+
+import errno
+import os
+import re
+import select
+import shutil
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from threading import Event, Thread
+from typing import BinaryIO, cast
+
+from riptide_cli.compress import EXTENSIONS, compressing_writer, decompressing_reader
+
+PIPES_SUPPORTED = sys.platform == "linux"
+COPY_CHUNK_SIZE = 1024 * 1024
+# Seconds between two checks whether the driver opened the pipe.
+OPEN_INTERVAL = 0.05
+_SIZE_RE = re.compile(r"^(\d+)([kmgt]?)b?$", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+
+
+def parse_size(value: str) -> int:
+    """Parses a size given on the command line, in bytes or with a unit (e.g. 500M, 2G). Units are binary."""
+    match = _SIZE_RE.match(value.strip())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid size: {value}")
+    return int(match.group(1)) * _SIZE_UNITS[match.group(2).lower()]
+
+
+def decompressed_name(path: str) -> str:
+    """Name of the decompressed dump: The name of the dump without the extension of the compression."""
+    name = os.path.basename(path)
+    for extension in EXTENSIONS:
+        if name.endswith(extension) and len(name) > len(extension):
+            return name[: -len(extension)]
+    return name
+
+
+class DumpReader:
+    """A compressed dump opened for decompressing. position returns how much of the dump was read."""
+
+    def __init__(self, path: str, compression: str):
+        self.size = os.path.getsize(path)
+        self.file = open(path, "rb")
+        self.reader = decompressing_reader(self.file, compression, process=True)
+
+    def position(self) -> int:
+        # The position of the file is shared with decompressing processes.
+        try:
+            return os.lseek(self.file.fileno(), 0, os.SEEK_CUR)
+        except (OSError, ValueError):
+            return self.size
+
+    def copy_to(self, out: BinaryIO):
+        while True:
+            chunk = self.reader.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            out.write(chunk)
+
+    def close(self):
+        self.reader.close()
+
+
+class ChunkedFile:
+    """File split into chunks of chunk_size bytes, named like the file with the suffixes .001, .002, etc."""
+
+    def __init__(self, path: str, chunk_size: int):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.paths: list[str] = []
+        self.file: BinaryIO | None = None
+        self.left = 0
+
+    def write(self, data: bytes) -> int:
+        view = memoryview(data)
+        while view:
+            if self.file is None or self.left == 0:
+                self._next()
+            assert self.file is not None
+            written = self.file.write(view[: self.left])
+            self.left -= written
+            view = view[written:]
+        return len(data)
+
+    def _next(self):
+        self.close()
+        self.paths.append(f"{self.path}.{len(self.paths) + 1:03d}")
+        self.file = open(self.paths[-1], "wb")
+        self.left = self.chunk_size
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class DumpWriter:
+    """
+    An export opened for writing, compressed and/or split into chunks (chunk_size bytes each), if given.
+    position returns how much was written to it (uncompressed).
+    """
+
+    def __init__(self, path: str, compression: str | None, chunk_size: int | None):
+        self.read = 0
+        self.chunks = ChunkedFile(path, chunk_size) if chunk_size else None
+        self.out = cast(BinaryIO, self.chunks) if self.chunks is not None else open(path, "wb")
+        self.writer = compressing_writer(self.out, compression, process=True) if compression else self.out
+
+    @property
+    def paths(self) -> list[str] | None:
+        """The paths of all chunks written, None if not split into chunks."""
+        return self.chunks.paths if self.chunks is not None else None
+
+    def position(self) -> int:
+        return self.read
+
+    def copy_from(self, file: BinaryIO):
+        while True:
+            chunk = file.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            self.writer.write(chunk)
+            self.read += len(chunk)
+
+    def copy_file(self, path: str):
+        with open(path, "rb") as file:
+            self.copy_from(file)
+
+    def close(self):
+        try:
+            self.writer.close()
+        finally:
+            # Already closed by the compressing stream, unless that failed.
+            self.out.close()
+
+
+class PipeNotReadError(Exception):
+    pass
+
+
+class DumpPipe(Thread):
+    """
+    Named pipe in a temporary directory, passed to the database driver in place of a dump. As soon as the
+    driver opens it, transfer is called with the other end, to write the dump to it (mode "wb", imports) or to
+    read the dump from it (mode "rb", exports). Use as context manager and call finish after the driver is done.
+    """
+
+    def __init__(self, name: str, mode: str, transfer: Callable[[BinaryIO], None]):
+        super().__init__(daemon=True)
+        self.mode = mode
+        self.transfer = transfer
+        self.directory = tempfile.mkdtemp(prefix="riptide-dump-")
+        self.path = os.path.join(self.directory, name)
+        os.mkfifo(self.path, 0o600)
+        self.connected = False
+        self.error: BaseException | None = None
+        self.cancelled = Event()
+
+    def run(self):
+        try:
+            fd = self._open_writer() if self.mode == "wb" else self._open_reader()
+            if fd is None:
+                return
+            self.connected = True
+            with cast(BinaryIO, open(fd, self.mode)) as file:
+                self.transfer(file)
+        except BaseException as ex:
+            self.error = ex
+
+    def _open_writer(self) -> int | None:
+        """Opens the pipe for writing, once it is opened for reading. None if cancelled before that."""
+        while not self.cancelled.is_set():
+            try:
+                fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as ex:
+                if ex.errno != errno.ENXIO:
+                    raise
+                time.sleep(OPEN_INTERVAL)
+                continue
+            os.set_blocking(fd, True)
+            return fd
+        return None
+
+    def _open_reader(self) -> int | None:
+        """Opens the pipe for reading, once it was opened for writing. None if cancelled before that."""
+        fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        poller = select.poll()
+        poller.register(fd, select.POLLIN)
+        while True:
+            cancelled = self.cancelled.is_set()
+            # Linux only reports the end of the pipe (POLLHUP) if it was opened for writing since.
+            if poller.poll(OPEN_INTERVAL * 1000):
+                os.set_blocking(fd, True)
+                return fd
+            if cancelled:
+                os.close(fd)
+                return None
+
+    def finish(self):
+        """
+        Waits until the dump was transferred. Raises the error that occurred while transferring it, or
+        PipeNotReadError, if the pipe was never opened by the driver.
+        """
+        self.cancelled.set()
+        self.join()
+        if not self.connected:
+            raise PipeNotReadError("The dump was not read from or written to the pipe.")
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, *args):
+        self.cancelled.set()
+        # When interrupted, the driver may still be blocked on the pipe; the thread is left to exit with the process.
+        if exc_type is None:
+            self.join()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+@contextmanager
+def temporary_dump(path: str) -> Iterator[str]:
+    """Path of a temporary file for the decompressed dump, next to the dump if possible. Removed afterwards."""
+    try:
+        directory = tempfile.mkdtemp(prefix=".riptide-import-", dir=os.path.dirname(path))
+    except OSError:
+        directory = tempfile.mkdtemp(prefix="riptide-import-")
+    try:
+        yield os.path.join(directory, decompressed_name(path))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,73 @@
+"""
+Fingerprints of the inputs of the "heavy operations" run when loading a project (see load_riptide_core).
+
+The fingerprints are stored in the _riptide folder of the project. An operation only needs to run again, if the
+fingerprint of its inputs changed.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any
+
+from riptide.config.files import get_project_meta_folder
+
+FINGERPRINTS_FILE_NAME = ".fingerprints.json"
+# Increase if the output of any of the operations changes between versions, to force them to run again.
+FINGERPRINTS_VERSION = 2
+
+
+def file_stat(path: str) -> tuple[int, int] | None:
+    """Cheap fingerprint of a file or directory: (mtime, size) or None, if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class Fingerprints:
+    """Fingerprints of the heavy operations of a single project."""
+
+    path: str
+    fingerprints: dict[str, str]
+    dirty: bool
+
+    def __init__(self, project_folder: str):
+        self.path = os.path.join(get_project_meta_folder(project_folder), FINGERPRINTS_FILE_NAME)
+        self.dirty = False
+        try:
+            with open(self.path) as fp:
+                self.fingerprints = json.load(fp)
+        except (OSError, ValueError):
+            self.fingerprints = {}
+        if not isinstance(self.fingerprints, dict) or self.fingerprints.get("$version") != str(FINGERPRINTS_VERSION):
+            self.fingerprints = {"$version": str(FINGERPRINTS_VERSION)}
+
+    @staticmethod
+    def _hash(inputs: Any) -> str:
+        return hashlib.sha1(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+    def changed(self, operation: str, inputs: Any) -> bool:
+        """Returns whether the inputs of the operation changed since it was last recorded."""
+        return self.fingerprints.get(operation) != self._hash(inputs)
+
+    def record(self, operation: str, inputs: Any):
+        """Records the inputs of an operation that just ran."""
+        fingerprint = self._hash(inputs)
+        if self.fingerprints.get(operation) != fingerprint:
+            self.fingerprints[operation] = fingerprint
+            self.dirty = True
+
+    def forget(self, operation: str):
+        """Forces the operation to run again next time."""
+        if operation in self.fingerprints:
+            del self.fingerprints[operation]
+            self.dirty = True
+
+    def save(self):
+        """Writes the fingerprints, if any of them changed."""
+        if self.dirty:
+            with open(self.path, "w") as fp:
+                json.dump(self.fingerprints, fp)
+            self.dirty = False
@@ -2,8 +2,11 @@ from __future__ import annotations
 
 import asyncio
 import sys
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
 from functools import update_wrapper
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import click
 import rich
@@ -126,6 +129,23 @@ def async_command(interrupt_handler=lambda _, __: True):
     return decorator
 
 
+def run_in_thread(func: Callable[..., Any], *args: Any) -> Future:
+    """
+    Runs the function in a new thread. Daemon threads are used, so engine calls that never return
+    don't block exiting.
+    """
+    future: Future = Future()
+
+    def run():
+        try:
+            future.set_result(func(*args))
+        except BaseException as ex:
+            future.set_exception(ex)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
 def interrupt_handler(ctx, ex: KeyboardInterrupt | SystemExit):
     """Handle interrupts raised while running asynchronous AsyncIO code, fun stuff!"""
     # In case there are any open progress bars, close them:
@@ -11,7 +11,6 @@ from riptide.hook.additional_volumes import HookHostPathArgument
 from riptide.hook.cli import HookCliDisplay
 from riptide.hook.event import AnyHookEvent
 from riptide.hook.manager import HookArgument
-
 from riptide_cli.helpers import RiptideCliError, rule
 
 if TYPE_CHECKING:
@@ -1,3 +1,5 @@
+import time
+from dataclasses import dataclass
 from typing import Sequence, TypedDict
 
 from rich.console import Group, group
@@ -8,11 +10,13 @@ from rich.progress import BarColumn, Progress, SpinnerColumn, TaskID, TextColumn
 from rich.table import Column, Table
 from rich.tree import Tree
 from riptide.engine.results import ResultError, StartStopResultStep
-from riptide.engine.status import StatusResult, status_for
+from riptide.engine.status import StatusResult
 from riptide.hook.event import HookEvent
 from riptide_cli.helpers import RiptideCliError, get_is_verbose
 from riptide_cli.hook import trigger_and_handle_hook
 from riptide_cli.loader import RiptideCliCtx
+from riptide_cli.output import print_structured
+from riptide_cli.status import status_collector, status_to_dict
 
 
 def _build_progress_jobs(console_width: int, services: Sequence[str]) -> tuple[Progress, dict[str, TaskID]]:
@@ -131,12 +135,18 @@ async def start_project(ctx, services: list[str], show_status=True, quick=False,
 
     display_errors(ctx.start_stop_errors, ctx)
 
-    status = status_for(project, engine, ctx.system_config)
+    collector = status_collector(ctx)
+    collector.invalidate(services)
+    status = collector.collect()
 
     trigger_and_handle_hook(
         ctx,
         HookEvent.PostStart,
-        [",".join((svc for svc, status_item in status.items() if status_item.running and svc in services))],
+        [
+            ",".join(
+                svc for svc, status_item in status.items() if status_item and status_item.running and svc in services
+            )
+        ],
     )
 
     if show_status:
@@ -171,24 +181,26 @@ async def stop_project(ctx, services: list[str], show_status=True):
 
     display_errors(ctx.start_stop_errors, ctx)
 
-    status = status_for(project, engine, ctx.system_config)
+    collector = status_collector(ctx)
+    collector.invalidate(services)
+    status = collector.collect()
 
     trigger_and_handle_hook(
         ctx,
         HookEvent.PostStop,
-        [",".join((svc for svc, status_item in status.items() if not status_item.running))],
+        [",".join(svc for svc, status_item in status.items() if status_item and not status_item.running)],
     )
 
     if show_status:
         status_project(ctx, status_items=status)
 
 
-def status_project(ctx, limit_services=None, *, status_items: dict[str, StatusResult] | None = None):
+def status_project(ctx, limit_services=None, *, status_items: dict[str, StatusResult | None] | None = None):
     """
     Shows the status of Riptide and the loaded project (if any) by collecting data from the engine.
     :type limit_services: None or List that includes names of services to show status for
-    :type status_items: Status items to display. If set, these are used,
-                        otherwise the status is determined from the configuration and engine.
+    :type status_items: Status items to display (None for services with an unknown status). If set, these are
+                        used, otherwise the status is determined from the configuration and engine.
 
     """
     ctx.console.print(
@@ -196,9 +208,127 @@ def status_project(ctx, limit_services=None, *, status_items: dict[str, StatusRe
     )
 
 
+def status_project_structured(ctx, output_format: str):
+    """Like status_project, but prints machine readable output, see riptide_cli.output."""
+    system_config = ctx.system_config
+    project = system_config["project"] if system_config is not None and "project" in system_config else None
+    services = []
+    if project is not None and ctx.project_is_set_up:
+        services = [status_to_dict(name, result) for name, result in status_collector(ctx).collect().items()]
+    document = {
+        "project": project["name"] if project is not None else None,
+        "set_up": bool(project is not None and ctx.project_is_set_up),
+        "services": services,
+    }
+    print_structured(output_format, document, services)
+
+
+# Polling intervals (in seconds) of status_project_watch.
+WATCH_MAX_INTERVAL = 30.0
+WATCH_REFRESH_INTERVAL = 1.0
+
+
+@dataclass
+class _WatchedService:
+    """State of a service, as observed by status_project_watch."""
+
+    interval: float
+    next_poll: float
+    running: bool | None = None
+    # Time the service was last seen starting or stopping, None if it did not change yet.
+    changed_at: float | None = None
+    restarts: int = 0
+
+
+def status_project_watch(ctx, limit_services=None, interval: float = 2.0):
+    """
+    Like status_project, but keeps the status updated until interrupted.
+
+    Services are polled individually: The status of services that did not change is polled less and less
+    often (up to every WATCH_MAX_INTERVAL seconds), services that did change are polled every interval seconds
+    again. The engine doesn't report when services were started, so uptime and restarts are only shown for
+    changes observed while watching.
+    """
+    system_config = ctx.system_config
+    if system_config is None or "project" not in system_config or not ctx.project_is_set_up:
+        status_project(ctx, limit_services)
+        return
+
+    collector = status_collector(ctx)
+    services = collector.collect()
+    now = time.monotonic()
+    watched = {
+        name: _WatchedService(interval, now + interval, None if status is None else status.running)
+        for name, status in services.items()
+    }
+
+    def poll(now: float):
+        due = [name for name, state in watched.items() if state.next_poll <= now]
+        collector.invalidate(due)
+        services.update(collector.collect(due))
+        for name in due:
+            state = watched[name]
+            running = None if services[name] is None else services[name].running  # type: ignore
+            if state.running is not None and running is not None and running != state.running:
+                state.changed_at = now
+                state.interval = interval
+                if running:
+                    state.restarts += 1
+            else:
+                state.interval = min(state.interval * 2, WATCH_MAX_INTERVAL)
+            if running is not None:
+                state.running = running
+            state.next_poll = now + state.interval
+
+    def render(now: float):
+        details = {}
+        for name, state in watched.items():
+            lines = []
+            if state.changed_at is not None:
+                since = _format_duration(now - state.changed_at)
+                lines.append(f":stopwatch: {'Up' if state.running else 'Down'} for {since}")
+            if state.restarts > 0:
+                lines.append(f":repeat: Started {state.restarts} time(s) while watching")
+            details[name] = lines
+        return Group(
+            Panel(
+                _status_project_render_group(ctx, limit_services, services, details),
+                title="Status",
+                title_align="left",
+            ),
+            f"[grey62]Updated {time.strftime('%H:%M:%S')}. Press Ctrl+C to stop watching.",
+        )
+
+    try:
+        with Live(render(now), console=ctx.console, auto_refresh=False) as live:
+            while True:
+                # Until the next service is due, but refresh the times shown at least every WATCH_REFRESH_INTERVAL.
+                next_poll = min((state.next_poll for state in watched.values()), default=now + WATCH_REFRESH_INTERVAL)
+                time.sleep(max(0.0, min(next_poll - now, WATCH_REFRESH_INTERVAL)))
+                now = time.monotonic()
+                poll(now)
+                live.update(render(now), refresh=True)
+    except KeyboardInterrupt:
+        pass
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes}m"
+    if minutes:
+        return f"{minutes}m {seconds}s"
+    return f"{seconds}s"
+
+
 @group()
-def _status_project_render_group(ctx, limit_services=None, status_items: dict[str, StatusResult] | None = None):
-    engine = ctx.engine
+def _status_project_render_group(
+    ctx,
+    limit_services=None,
+    status_items: dict[str, StatusResult | None] | None = None,
+    details: dict[str, list[str]] | None = None,
+):
     system_config = ctx.system_config
     project = None
 
@@ -215,7 +345,7 @@ def _status_project_render_group(ctx, limit_services=None, status_items: dict[st
             yield "[yellow]Project is not yet set up. Run the setup command."
             return
         else:
-            status_items = status_for(project, engine, ctx.system_config)
+            status_items = status_collector(ctx).collect()
 
     if status_items is not None:
         if len(status_items) < 1:
@@ -225,10 +355,17 @@ def _status_project_render_group(ctx, limit_services=None, status_items: dict[st
         for name, status in status_items.items():
             if limit_services and name not in limit_services:
                 continue
-            if status.running:
+            if status is None:
+                t_service = tree.add(f"[yellow]:grey_question: {escape(name)} (status unknown)[/]")
+            elif status.running:
                 t_service = tree.add(f"[green]:play_button: {escape(name)}[/]")
             else:
                 t_service = tree.add(f"[red]:black_square_for_stop: {escape(name)}[/]")
+            if details:
+                for line in details.get(name, []):
+                    t_service.add(line)
+            if status is None:
+                continue
             if status.running:
                 if status.web:
                     t_service.add(f":globe_with_meridians: Web: [underline]{status.web}")
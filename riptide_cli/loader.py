@@ -1,22 +1,35 @@
 from __future__ import annotations
 
 import os
+import platform
 from typing import TypedDict, cast
 
 from click import Context
 from configcrunch import ReferencedDocumentNotFound
 from rich.console import Console
 from riptide.config.document.config import Config
-from riptide.config.files import get_project_setup_flag_path
+from riptide.config.files import (
+    get_project_hooks_config_file_path,
+    get_project_setup_flag_path,
+    riptide_hooks_config_file,
+    riptide_projects_file,
+)
 from riptide.config.hosts import update_hosts_file
-from riptide.config.loader import load_config, write_project
+from riptide.config.loader import write_project
 from riptide.engine.abstract import AbstractEngine
 from riptide.engine.loader import load_engine
 from riptide.hook.manager import HookManager
 from riptide_cli.command.constants import CMD_CONFIG_EDIT_USER
+from riptide_cli.config_cache import load_config_cached
+from riptide_cli.fingerprints import Fingerprints, file_stat
 from riptide_cli.helpers import RiptideCliError, warn
 from riptide_cli.hook import RiptideCliHookDisplay
-from riptide_cli.shell_integration import update_shell_integration
+from riptide_cli.shell_integration import (
+    project_index_path,
+    shell_integration_inputs,
+    update_project_index,
+    update_shell_integration,
+)
 
 
 class RiptideCliCtx(Context):
@@ -34,16 +47,17 @@ class RiptideCliOptions(TypedDict, total=False):
     verbose: bool
     skip_hooks: bool
     rename: bool
+    status_timeout: float | None
 
 
 def load_riptide_system_config(project, skip_project_load=False):
     """
-    Loads the system configuration
+    Loads the system configuration. The result is cached, see riptide_cli.config_cache.
     :param project:             Project to load, None for auto-detect
     :param skip_project_load:   Skip project loading. If True, the project setting will be ignored
     :return:
     """
-    return load_config(project, skip_project_load=skip_project_load)
+    return load_config_cached(project, skip_project_load=skip_project_load)
 
 
 def load_riptide_core(ctx: RiptideCliCtx, allow_heavy_operations=True, *, skip_project_load=False):
@@ -58,6 +72,8 @@ def load_riptide_core(ctx: RiptideCliCtx, allow_heavy_operations=True, *, skip_p
     - Loads Shell integration
     - Creates CLI alias scripts
     - Initializes the hook manager (loads git hooks, etc.)
+    Each of these operations is skipped if none of its inputs changed since it last ran for the project
+    (see riptide_cli.fingerprints).
     """
     if ctx.parent is not None:
         ctx.console = ctx.parent.console  # type: ignore
@@ -88,26 +104,44 @@ def load_riptide_core(ctx: RiptideCliCtx, allow_heavy_operations=True, *, skip_p
         except Exception as ex:
             raise RiptideCliError("Error parsing the system or project configuration.", ctx) from ex
         else:
+            fingerprints = None
             if "project" in ctx.system_config:
                 if allow_heavy_operations:
+                    # Each heavy operation only runs if its inputs changed since the last time.
+                    fingerprints = Fingerprints(ctx.system_config["project"].folder())
                     # Write project name -> path mapping into projects.json file.
-                    try:
-                        write_project(ctx.system_config["project"], parent_ctx.riptide_options["rename"])
-                    except FileExistsError as err:
-                        raise RiptideCliError(str(err), ctx) from err
+                    rename = parent_ctx.riptide_options["rename"]
+                    if rename or fingerprints.changed("projects", _projects_file_inputs(ctx.system_config)):
+                        try:
+                            write_project(ctx.system_config["project"], rename)
+                        except FileExistsError as err:
+                            raise RiptideCliError(str(err), ctx) from err
+                        update_project_index()
+                        fingerprints.record("projects", _projects_file_inputs(ctx.system_config))
                     # Update /etc/hosts entries for the loaded project
-                    update_hosts_file(
-                        ctx.system_config, warning_callback=lambda msg: warn(ctx.console, msg, boxed=True)
-                    )
+                    if fingerprints.changed("hosts", _hosts_file_inputs(ctx.system_config)):
+                        hosts_warnings = []
+
+                        def hosts_warning_callback(msg):
+                            hosts_warnings.append(msg)
+                            warn(ctx.console, msg, boxed=True)
+
+                        update_hosts_file(ctx.system_config, warning_callback=hosts_warning_callback)
+                        # If the file could not be written, try (and warn) again next time.
+                        if len(hosts_warnings) < 1:
+                            fingerprints.record("hosts", _hosts_file_inputs(ctx.system_config))
 
                 # Check if project setup command was run yet.
                 ctx.project_is_set_up = os.path.exists(
                     get_project_setup_flag_path(ctx.system_config["project"].folder())
                 )
 
-                if allow_heavy_operations:
+                if fingerprints is not None:
                     # Update shell integration
-                    update_shell_integration(ctx.system_config)
+                    if fingerprints.changed("shell_integration", shell_integration_inputs(ctx.system_config)):
+                        update_shell_integration(ctx.system_config)
+                        fingerprints.record("shell_integration", shell_integration_inputs(ctx.system_config))
+                    fingerprints.save()
 
             # Load engine
             try:
@@ -120,7 +154,12 @@ def load_riptide_core(ctx: RiptideCliCtx, allow_heavy_operations=True, *, skip_p
 
             # Load the hook manager
             ctx.hook_manager = HookManager(ctx.system_config, ctx.engine, cli=RiptideCliHookDisplay(ctx.console))
-            if allow_heavy_operations:
+            if fingerprints is not None:
+                if fingerprints.changed("hooks", _hook_setup_inputs(ctx.system_config)):
+                    ctx.hook_manager.setup()
+                    fingerprints.record("hooks", _hook_setup_inputs(ctx.system_config))
+                fingerprints.save()
+            elif allow_heavy_operations:
                 ctx.hook_manager.setup()
 
         ctx.loaded = True
@@ -129,3 +168,46 @@ def load_riptide_core(ctx: RiptideCliCtx, allow_heavy_operations=True, *, skip_p
 def cmd_constraint_project_loaded(ctx: RiptideCliCtx):
     if ctx.system_config is None or "project" not in ctx.system_config:
         raise RiptideCliError("A project must be loaded to use this command.", ctx)
+
+
+def _projects_file_inputs(system_config: Config):
+    """Inputs of writing the project to the projects.json file and the project index."""
+    project = system_config["project"]
+    return [
+        project["name"],
+        project.internal_get("$path"),
+        file_stat(riptide_projects_file()),
+        file_stat(project_index_path()),
+    ]
+
+
+def _hosts_file_inputs(system_config: Config):
+    """Inputs of updating the hosts file, see riptide.config.hosts.update_hosts_file."""
+    if system_config["update_hosts_file"] is False:
+        return [False]
+    if isinstance(system_config["update_hosts_file"], str):
+        hosts_path = system_config["update_hosts_file"]
+    elif platform.system() == "Darwin":
+        hosts_path = "/private/etc/hosts"
+    elif platform.system() == "Windows":
+        hosts_path = r"C:\Windows\System32\Drivers\etc\hosts"
+    else:
+        hosts_path = "/etc/hosts"
+    domains = [system_config["proxy"]["url"]]
+    if "services" in system_config["project"]["app"]:
+        for service in system_config["project"]["app"]["services"].values():
+            domains.append(service.domain())
+            domains.extend(service.additional_domains().values())
+    return [hosts_path, file_stat(hosts_path), domains]
+
+
+def _hook_setup_inputs(system_config: Config):
+    """Inputs of setting up hook configuration files and git hooks, see riptide.hook.manager.HookManager.setup."""
+    project_folder = system_config["project"].folder()
+    return [
+        {key: hook.to_dict() for key, hook in system_config["hooks"].items()},
+        {key: hook.to_dict() for key, hook in system_config["project"]["app"]["hooks"].items()},
+        file_stat(riptide_hooks_config_file()),
+        file_stat(get_project_hooks_config_file_path(project_folder)),
+        file_stat(os.path.join(project_folder, ".git", "hooks")),
+    ]
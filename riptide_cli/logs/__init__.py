@@ -0,0 +1 @@
+"""Reading and following the log files of services, used by the log command."""
@@ -0,0 +1,90 @@
+"""
+Bounded buffers between the readers of log files and the printer.
+
+Each source (log file) has its own buffer of limited size. If the buffer of a source is full, either the
+reader waits until the printer caught up (OVERFLOW_BLOCK) or the oldest lines of the source are dropped
+(OVERFLOW_DROP); the number of dropped lines is reported in place of them. The printer takes lines from all
+sources in turns, so a single noisy source can not hold back the others.
+"""
+
+from collections import deque
+from collections.abc import Callable, Hashable
+from threading import Condition
+from typing import Generic, TypeVar
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP = "drop"
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP)
+# Number of lines buffered for each source.
+DEFAULT_BUFFER_LINES = 10000
+
+T = TypeVar("T")
+
+
+class LineBuffers(Generic[T]):
+    """
+    Bounded buffers for multiple sources.
+    dropped_marker is called with the source and the number of dropped lines, to create an entry that
+    reports them.
+    """
+
+    def __init__(
+        self,
+        policy: str,
+        dropped_marker: Callable[[Hashable, int], T],
+        max_lines: int = DEFAULT_BUFFER_LINES,
+    ):
+        self.policy = policy
+        self.dropped_marker = dropped_marker
+        self.max_lines = max_lines
+        self._cond = Condition()
+        self._buffers: dict[Hashable, deque[T]] = {}
+        self._dropped: dict[Hashable, int] = {}
+        # Sources in the order they are served next
+        self._order: list[Hashable] = []
+
+    def put(self, source: Hashable, entry: T, block: bool | None = None):
+        """
+        Adds an entry of a source. If the buffer of the source is full, waits or drops the oldest entry,
+        depending on the policy. block overrides the policy.
+        """
+        if block is None:
+            block = self.policy == OVERFLOW_BLOCK
+        with self._cond:
+            buffer = self._buffers.get(source)
+            if buffer is None:
+                buffer = self._buffers[source] = deque()
+                self._dropped[source] = 0
+                self._order.append(source)
+            if block:
+                while len(buffer) >= self.max_lines:
+                    self._cond.wait(0.5)
+            elif len(buffer) >= self.max_lines:
+                buffer.popleft()
+                self._dropped[source] += 1
+            buffer.append(entry)
+            self._cond.notify_all()
+
+    def get_batch(self, max_entries: int, timeout: float) -> list[T]:
+        """
+        Removes and returns up to max_entries entries, taken from all sources in turns.
+        Waits up to timeout seconds for entries, returns an empty list if there are none.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: any(self._buffers.values()), timeout):
+                return []
+            active = [source for source in self._order if self._buffers[source]]
+            share = max(1, max_entries // len(active))
+            batch: list[T] = []
+            for source in active:
+                buffer = self._buffers[source]
+                if self._dropped[source]:
+                    batch.append(self.dropped_marker(source, self._dropped[source]))
+                    self._dropped[source] = 0
+                for _ in range(min(share, len(buffer))):
+                    batch.append(buffer.popleft())
+            # The next batch starts with the source after the first one of this batch.
+            first = self._order.index(active[0])
+            self._order = self._order[first + 1 :] + self._order[: first + 1]
+            self._cond.notify_all()
+            return batch
@@ -0,0 +1,81 @@
+"""
+Exporting lines of log files as NDJSON.
+
+Each line is written as one JSON object::
+
+    {"service": "www", "log": "stdout", "file": "stdout.log", "offset": 1234, "time": "2024-01-31T12:00:00+00:00",
+     "line": "..."}
+
+``offset`` is the position of the line in the (decompressed) file and ``time`` the detected timestamp of the line
+(or of the lines before it, see riptide_cli.logs.timestamps), null if there is none. The output is compressed
+based on the extension of the file. Lines are written in chunks, so memory use does not depend on the number
+of lines.
+"""
+
+import json
+import math
+import os
+from datetime import datetime, timezone
+from typing import BinaryIO
+
+from riptide_cli.compress import open_compressed_writer
+
+# Number of bytes collected before they are written.
+WRITE_CHUNK_SIZE = 1024 * 1024
+
+
+class LogExporter:
+    """Writes lines of log files to an NDJSON file. Use as a context manager."""
+
+    path: str
+    count: int
+    _file: BinaryIO | None
+    _chunk: list[bytes]
+    _chunk_size: int
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._chunk = []
+        self._chunk_size = 0
+
+    def __enter__(self):
+        self._file = open_compressed_writer(self.path)
+        return self
+
+    def __exit__(self, *args):
+        assert self._file is not None
+        try:
+            self._flush()
+        finally:
+            self._file.close()
+
+    def write(self, service: str, logkey: str, path: str, offset: int, line_time: float | None, line: bytes):
+        record = {
+            "service": service,
+            "log": logkey,
+            "file": os.path.basename(path),
+            "offset": offset,
+            "time": _format_time(line_time),
+            "line": line.decode("utf-8", errors="replace").rstrip("\r\n"),
+        }
+        encoded = json.dumps(record, ensure_ascii=False).encode() + b"\n"
+        self._chunk.append(encoded)
+        self._chunk_size += len(encoded)
+        self.count += 1
+        if self._chunk_size >= WRITE_CHUNK_SIZE:
+            self._flush()
+
+    def _flush(self):
+        assert self._file is not None
+        if self._chunk:
+            self._file.write(b"".join(self._chunk))
+            self._chunk = []
+            self._chunk_size = 0
+
+
+def _format_time(line_time: float | None) -> str | None:
+    if line_time is None or not math.isfinite(line_time):
+        return None
+    return datetime.fromtimestamp(line_time, timezone.utc).isoformat()
@@ -0,0 +1,131 @@
+"""
+Filtering lines of log files by content, time and severity.
+
+Lines are filtered as raw bytes, before they are decoded and printed. The time and severity of a line are
+detected at its start: Timestamps in the formats supported by riptide_cli.logs.timestamps and severities like
+``ERROR`` or ``warn``. Lines without a timestamp or severity (for example the lines of a stack trace) have the ones
+of the line before them. Lines before the first line with a timestamp or severity are not shown, if filtering
+by them.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+
+from riptide_cli.logs.timestamps import DETECTION_LENGTH, detect_time
+
+LEVELS = {
+    b"trace": 0,
+    b"debug": 10,
+    b"info": 20,
+    b"notice": 25,
+    b"warn": 30,
+    b"warning": 30,
+    b"err": 40,
+    b"error": 40,
+    b"crit": 50,
+    b"critical": 50,
+    b"alert": 50,
+    b"emerg": 50,
+    b"emergency": 50,
+    b"fatal": 50,
+}
+LEVEL_NAMES = ("trace", "debug", "info", "notice", "warning", "error", "critical")
+
+# Longer names first, so "warning" is not matched as "warn"
+_LEVEL_WORDS: list[bytes] = sorted(LEVELS, key=len, reverse=True)
+_LEVEL_RE = re.compile(rb"\b(" + b"|".join(_LEVEL_WORDS) + rb")\b", re.IGNORECASE)
+_REGEX_SPECIAL_CHARS = ".^$*+?{}[]\\|()"
+_RELATIVE_RE = re.compile(r"^(\d+)([smhd])$")
+_RELATIVE_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+
+def parse_time(value: str, now: datetime | None = None) -> float:
+    """
+    Parses a point in time given on the command line: A date and time in ISO 8601 format (local time,
+    if no time zone is given) or a duration before now (e.g. 30s, 10m, 2h, 1d). Returns a UNIX timestamp.
+    """
+    relative = _RELATIVE_RE.match(value.strip())
+    if relative:
+        now = now or datetime.now().astimezone()
+        return (now - timedelta(**{_RELATIVE_UNITS[relative.group(2)]: int(relative.group(1))})).timestamp()
+    return datetime.fromisoformat(value.strip()).timestamp()
+
+
+class LogFilter:
+    """
+    Which lines of log files to show. Use line_filter to get the filter for a single log file.
+
+    :param grep:  Regular expression (Python syntax), lines must contain a match.
+    :param since: Only lines with a timestamp at or after this (UNIX timestamp).
+    :param until: Only lines with a timestamp at or before this (UNIX timestamp).
+    :param level: Only lines with at least this severity (one of LEVEL_NAMES).
+    """
+
+    def __init__(
+        self,
+        grep: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        level: str | None = None,
+    ):
+        self.substring: bytes | None = None
+        self.pattern: re.Pattern[bytes] | None = None
+        if grep is not None:
+            if not any(char in grep for char in _REGEX_SPECIAL_CHARS):
+                # Plain text, a substring search is faster than a regular expression
+                self.substring = grep.encode()
+            else:
+                self.pattern = re.compile(grep.encode())
+        self.since = since
+        self.until = until
+        self.min_level = LEVELS[level.encode()] if level is not None else None
+
+    @property
+    def active(self) -> bool:
+        return (
+            self.substring is not None
+            or self.pattern is not None
+            or self.since is not None
+            or self.until is not None
+            or self.min_level is not None
+        )
+
+    def line_filter(self) -> LineFilter:
+        return LineFilter(self)
+
+
+class LineFilter:
+    """Filters the lines of a single log file, in order. Remembers the time and severity of the last line."""
+
+    def __init__(self, log_filter: LogFilter):
+        self.log_filter = log_filter
+        self.time: float | None = None
+        self.level: int | None = None
+
+    def accepts(self, line: bytes) -> bool:
+        f = self.log_filter
+        if f.since is not None or f.until is not None:
+            line_time = detect_time(line)
+            if line_time is not None:
+                self.time = line_time
+            if self.time is None:
+                return False
+            if (f.since is not None and self.time < f.since) or (f.until is not None and self.time > f.until):
+                return False
+        if f.min_level is not None:
+            match = _LEVEL_RE.search(line, 0, DETECTION_LENGTH)
+            if match:
+                self.level = LEVELS[match.group(1).lower()]
+            if self.level is None or self.level < f.min_level:
+                return False
+        if f.substring is not None:
+            return f.substring in line
+        if f.pattern is not None:
+            return f.pattern.search(line) is not None
+        return True
+
+    def filter(self, lines: Sequence[bytes]) -> list[bytes]:
+        return [line for line in lines if self.accepts(line)]
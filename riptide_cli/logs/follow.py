@@ -0,0 +1,257 @@
+"""
+Following log files for new lines.
+
+All files are followed by a single thread (LogFollower). On Linux, it sleeps until inotify reports changes to
+one of the directories containing the files; on other systems, or if inotify is not available, the files are
+polled. Truncated files are read again from the start and rotated files (the path now points to a different
+file) are read until their end, before continuing with the new file.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import os
+import select
+import struct
+import sys
+import time
+from collections.abc import Callable
+from threading import Thread
+from typing import Any, BinaryIO
+
+READ_CHUNK_SIZE = 64 * 1024
+# Even with inotify, all files are checked this often (in seconds). Changes to files on network file systems
+# or written from other machines (e.g. a VM running the containers) are not reported by inotify.
+SAFETY_CHECK_INTERVAL = 2.0
+# Interval (in seconds) of polling, if inotify is not available. Grows up to the maximum while nothing changes.
+POLL_INTERVAL_MIN = 0.05
+POLL_INTERVAL_MAX = 0.5
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_WATCH_MASK = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class FollowedFile:
+    """
+    A file that is followed for new lines. Lines are returned without the line break. An incomplete last line
+    is only returned once it is complete (or the file was truncated or rotated).
+    """
+
+    path: str
+    key: Any
+    file: BinaryIO | None
+    identity: tuple[int, int] | None
+    position: int
+    pending: bytes
+
+    def __init__(self, path: str, key: Any = None, file: BinaryIO | None = None):
+        """
+        :param path: Path of the file
+        :param key:  Any value identifying the file for the user of the follower
+        :param file: The file, if already opened (in binary mode). Following starts at its current position.
+        """
+        self.path = path
+        self.key = key
+        self.file = None
+        self.identity = None
+        self.position = 0
+        self.pending = b""
+        if file is not None:
+            self.file = file
+            st = os.fstat(file.fileno())
+            self.identity = (st.st_dev, st.st_ino)
+            self.position = file.tell()
+
+    def read_new(self) -> list[bytes]:
+        """Returns all complete lines that were added since the last call."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            # Deleted (maybe being rotated), finish reading the old file if it is still open.
+            return self._read_available()
+
+        lines = []
+        if self.file is not None and self.identity != (st.st_dev, st.st_ino):
+            # Rotated: Read the rest of the old file, then continue with the new one.
+            lines = self._read_available() + self._flush_pending()
+            self.close()
+        if self.file is None:
+            try:
+                self.file = open(self.path, "rb")
+            except OSError:
+                return lines
+            st = os.fstat(self.file.fileno())
+            self.identity = (st.st_dev, st.st_ino)
+            self.position = 0
+        elif st.st_size < self.position:
+            # Truncated
+            lines = self._flush_pending()
+            self.file.seek(0)
+            self.position = 0
+        return lines + self._read_available()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _read_available(self) -> list[bytes]:
+        if self.file is None:
+            return []
+        data = self.pending
+        while True:
+            chunk = self.file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            self.position += len(chunk)
+            data += chunk
+        lines = data.split(b"\n")
+        self.pending = lines.pop()
+        return [line.rstrip(b"\r") for line in lines]
+
+    def _flush_pending(self) -> list[bytes]:
+        pending = self.pending
+        self.pending = b""
+        return [pending] if pending else []
+
+
+class LogFollower(Thread):
+    """
+    Follows all given files in a single thread. on_lines is called (in this thread) with the file and the new
+    lines, whenever lines were added to a file.
+    """
+
+    daemon = True
+
+    poisoned: bool
+    files: list[FollowedFile]
+    on_lines: Callable[[FollowedFile, list[bytes]], None]
+
+    def __init__(self, files: list[FollowedFile], on_lines: Callable[[FollowedFile, list[bytes]], None]):
+        super().__init__()
+        self.poisoned = False
+        self.files = files
+        self.on_lines = on_lines
+
+    def run(self):
+        inotify = _Inotify.create()
+        try:
+            if inotify is not None:
+                self._follow_inotify(inotify)
+            else:
+                self._follow_polling()
+        finally:
+            if inotify is not None:
+                inotify.close()
+            for followed in self.files:
+                followed.close()
+
+    def _check(self, files: list[FollowedFile]) -> bool:
+        """Reads new lines of the given files. Returns whether there were any."""
+        found = False
+        for followed in files:
+            lines = followed.read_new()
+            if lines:
+                found = True
+                self.on_lines(followed, lines)
+        return found
+
+    def _follow_polling(self):
+        interval = POLL_INTERVAL_MIN
+        while not self.poisoned:
+            if self._check(self.files):
+                interval = POLL_INTERVAL_MIN
+            else:
+                interval = min(interval * 2, POLL_INTERVAL_MAX)
+            time.sleep(interval)
+
+    def _follow_inotify(self, inotify: _Inotify):
+        by_name: dict[tuple[int, bytes], list[FollowedFile]] = {}
+        for followed in self.files:
+            directory, name = os.path.split(os.path.abspath(followed.path))
+            try:
+                wd = inotify.add_watch(directory)
+            except OSError:
+                # Can't watch this directory, fall back to polling
+                return self._follow_polling()
+            by_name.setdefault((wd, os.fsencode(name)), []).append(followed)
+
+        # Catch up with changes made before the watches were added.
+        self._check(self.files)
+        last_full_check = time.monotonic()
+        while not self.poisoned:
+            events = inotify.read(0.5)
+            if any(mask & _IN_Q_OVERFLOW for _wd, mask, _name in events):
+                changed = self.files
+            else:
+                changed = []
+                for wd, _mask, event_name in events:
+                    for followed in by_name.get((wd, event_name), []):
+                        if followed not in changed:
+                            changed.append(followed)
+            if time.monotonic() - last_full_check > SAFETY_CHECK_INTERVAL:
+                changed = self.files
+                last_full_check = time.monotonic()
+            self._check(changed)
+
+
+class _Inotify:
+    """Minimal inotify binding (Linux only)."""
+
+    fd: int
+    _libc: Any
+
+    def __init__(self, libc: Any, fd: int):
+        self._libc = libc
+        self.fd = fd
+
+    @classmethod
+    def create(cls) -> _Inotify | None:
+        """Returns a new inotify instance or None, if inotify is not available."""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        return cls(libc, fd)
+
+    def add_watch(self, directory: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), directory)
+        return wd
+
+    def read(self, timeout: float) -> list[tuple[int, int, bytes]]:
+        """Waits up to timeout seconds for events and returns them as (watch descriptor, mask, file name)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
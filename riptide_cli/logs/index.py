@@ -0,0 +1,181 @@
+"""
+Sidecar index of log files.
+
+For each log file, an index (``.<name>.index`` next to the log file) records the byte offsets of all
+restart markers (lines starting with ``SERVICE RESTART -``) and checkpoints mapping byte offsets to line
+numbers. With it, the start of the current or any previous run of a service and the start of any line are
+found without reading the log file from the start.
+
+The index is only built when it is needed (to find previous runs or line numbers), as that reads the whole
+log file. The start of the current run is found by searching backwards from the end of the log file
+instead, unless there is a valid index. Whenever an index is used, it is updated: only the part of the log
+file that was added since then is read. If the log file was replaced or truncated (detected by the inode and
+a checksum of the last indexed bytes), the index is no longer valid. If the index can not be written, it is
+only kept in memory.
+"""
+
+import json
+import os
+import tempfile
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import BinaryIO
+
+INDEX_VERSION = 1
+READ_CHUNK_SIZE = 4 * 1024 * 1024
+# Number of bytes before the end of the indexed part of the file used to detect a replaced file.
+CHECKSUM_LENGTH = 256
+
+
+@dataclass
+class LogIndex:
+    identity: tuple[int, int] = (0, 0)
+    # Number of bytes of the file that are indexed; always the end of a line.
+    size: int = 0
+    # Number of lines in the indexed part.
+    lines: int = 0
+    checksum: int = 0
+    # For each restart marker: Offset of the start of its line, offset of the end of its line, line number (0-based).
+    markers: list[tuple[int, int, int]] = field(default_factory=list)
+    # Offset of the start of a line and its line number (0-based), at least every READ_CHUNK_SIZE bytes.
+    checkpoints: list[tuple[int, int]] = field(default_factory=list)
+
+    def run_start(self, runs_ago: int) -> int:
+        """
+        Returns the offset of the first line of a run of the service.
+        0 is the current run, 1 the run before, etc.
+        """
+        if runs_ago < len(self.markers):
+            return self.markers[-1 - runs_ago][1]
+        return 0
+
+    def line_start(self, file: BinaryIO, line: int) -> int:
+        """Returns the offset of the start of the line with the given number (0-based)."""
+        offset, current = 0, 0
+        for cp_offset, cp_line in self.checkpoints:
+            if cp_line > line:
+                break
+            offset, current = cp_offset, cp_line
+        file.seek(offset)
+        while current < line:
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return offset
+            count = chunk.count(b"\n")
+            if current + count < line:
+                current += count
+                offset += len(chunk)
+                continue
+            pos = -1
+            for _ in range(line - current):
+                pos = chunk.find(b"\n", pos + 1)
+            return offset + pos + 1
+        return offset
+
+
+def log_index(path: str, file: BinaryIO, marker: bytes, build: bool = True) -> LogIndex | None:
+    """
+    Returns the up-to-date index of the (opened) log file, updating the stored index if needed.
+    If there is no valid stored index, it is built from the whole file, or None is returned if build is False.
+    """
+    index_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.index")
+    st = os.fstat(file.fileno())
+    index = _load(index_path)
+    if index is None or not _matches(index, file, (st.st_dev, st.st_ino), st.st_size):
+        if not build:
+            return None
+        index = LogIndex(identity=(st.st_dev, st.st_ino))
+    if st.st_size > index.size and _update(index, file, marker):
+        _save(index_path, index)
+    return index
+
+
+def _matches(index: LogIndex, file: BinaryIO, identity: tuple[int, int], size: int) -> bool:
+    """Whether the index still belongs to the file: The same file, not truncated and the same content."""
+    if index.identity != identity or size < index.size:
+        return False
+    return _checksum(file, index.size) == index.checksum
+
+
+def _update(index: LogIndex, file: BinaryIO, marker: bytes) -> bool:
+    """Indexes all complete lines after the indexed part. Returns whether anything was indexed."""
+    updated = False
+    file.seek(index.size)
+    carry = b""
+    while True:
+        chunk = file.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        data = carry + chunk
+        end = data.rfind(b"\n") + 1
+        carry = data[end:]
+        if end == 0:
+            continue
+        base = index.size
+        # Offsets in data are relative to base, which is always the start of a line.
+        if not index.checkpoints or base - index.checkpoints[-1][0] >= READ_CHUNK_SIZE:
+            index.checkpoints.append((base, index.lines))
+        counted, line = 0, index.lines
+        for pos in _marker_lines(data, end, marker):
+            line += data.count(b"\n", counted, pos)
+            counted = pos
+            index.markers.append((base + pos, base + data.index(b"\n", pos) + 1, line))
+        index.lines += data.count(b"\n", 0, end)
+        index.size = base + end
+        updated = True
+    if updated:
+        index.checksum = _checksum(file, index.size)
+    return updated
+
+
+def _marker_lines(data: bytes, end: int, marker: bytes) -> Iterator[int]:
+    """Offsets of all lines in data[:end] starting with marker. data must start at the start of a line."""
+    if data.startswith(marker):
+        yield 0
+    pos = data.find(b"\n" + marker, 0, end)
+    while pos >= 0:
+        yield pos + 1
+        pos = data.find(b"\n" + marker, pos + 1, end)
+
+
+def _checksum(file: BinaryIO, size: int) -> int:
+    start = max(0, size - CHECKSUM_LENGTH)
+    file.seek(start)
+    return zlib.crc32(file.read(size - start))
+
+
+def _load(index_path: str) -> LogIndex | None:
+    try:
+        with open(index_path) as fp:
+            data = json.load(fp)
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return LogIndex(
+            identity=tuple(data["identity"]),
+            size=data["size"],
+            lines=data["lines"],
+            checksum=data["checksum"],
+            markers=[tuple(m) for m in data["markers"]],
+            checkpoints=[tuple(c) for c in data["checkpoints"]],
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _save(index_path: str, index: LogIndex):
+    data = {
+        "version": INDEX_VERSION,
+        "identity": index.identity,
+        "size": index.size,
+        "lines": index.lines,
+        "checksum": index.checksum,
+        "markers": index.markers,
+        "checkpoints": index.checkpoints,
+    }
+    try:
+        with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(index_path), delete=False) as tmp_file:
+            json.dump(data, tmp_file)
+        os.replace(tmp_file.name, index_path)
+    except OSError:
+        pass
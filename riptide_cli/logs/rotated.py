@@ -0,0 +1,40 @@
+"""
+Finding rotated versions of log files.
+
+Supported are the naming schemes of logrotate and similar tools: a number (``stdout.log.1``,
+``stdout.log.2.gz``; higher numbers are older) or a date (``stdout.log-20240131``, ``stdout.log-20240131.zst``)
+after the name of the log file, each optionally with the extension of a compression.
+"""
+
+import os
+import re
+
+from riptide_cli.compress import EXTENSIONS
+
+_COMPRESSION_EXTENSION = "(?:" + "|".join(re.escape(extension) for extension in EXTENSIONS) + ")?"
+_NUMBERED_RE = re.compile(r"^\.(\d+)" + _COMPRESSION_EXTENSION + "$")
+_DATED_RE = re.compile(r"^-(\d+)" + _COMPRESSION_EXTENSION + "$")
+
+
+def rotated_files(path: str) -> list[str]:
+    """Returns the paths of the rotated versions of the log file, oldest first."""
+    directory, name = os.path.split(path)
+    try:
+        entries = os.listdir(directory or ".")
+    except OSError:
+        return []
+    dated: list[tuple[int, str]] = []
+    numbered: list[tuple[int, str]] = []
+    for entry in entries:
+        if not entry.startswith(name) or entry == name:
+            continue
+        suffix = entry[len(name) :]
+        match = _DATED_RE.match(suffix)
+        if match:
+            dated.append((int(match.group(1)), entry))
+            continue
+        match = _NUMBERED_RE.match(suffix)
+        if match:
+            numbered.append((int(match.group(1)), entry))
+    ordered = [entry for _, entry in sorted(dated)] + [entry for _, entry in sorted(numbered, reverse=True)]
+    return [os.path.join(directory, entry) for entry in ordered]
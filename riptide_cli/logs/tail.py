@@ -0,0 +1,90 @@
+"""
+Finding positions near the end of log files without reading them from the start.
+
+The file is read backwards in chunks (with pread), so only the end of the file that contains the searched
+lines is actually read, no matter how large the file is. The file may be truncated while it is searched
+(copytruncate); reads past its new end return less data, which ends the search.
+"""
+
+import os
+from collections.abc import Iterator
+from typing import BinaryIO
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def last_marker_end(file: BinaryIO, marker: bytes) -> int:
+    """
+    Returns the position after the last line of the file that starts with marker. 0 if there is no such line.
+    """
+    fd = file.fileno()
+    size = os.fstat(fd).st_size
+    needle = b"\n" + marker
+    line_start = None
+    for chunk_start, data in _chunks_backwards(fd, 0, size, len(needle) - 1):
+        pos = data.rfind(needle)
+        if pos >= 0:
+            line_start = chunk_start + pos + 1
+            break
+    if line_start is None:
+        if os.pread(fd, len(marker), 0) != marker:
+            return 0
+        line_start = 0
+    for chunk_start, data in _chunks_forwards(fd, line_start, size):
+        pos = data.find(b"\n")
+        if pos >= 0:
+            return chunk_start + pos + 1
+    return size
+
+
+def tail_start(file: BinaryIO, lines: int, start: int = 0) -> int:
+    """
+    Returns the position at which the last `lines` lines of the file begin, but not before start.
+    An incomplete last line counts as a line.
+    """
+    fd = file.fileno()
+    end = os.fstat(fd).st_size
+    if end == 0:
+        return 0
+    if lines <= 0:
+        return end
+    if end > start and os.pread(fd, 1, end - 1) == b"\n":
+        end -= 1
+    for chunk_start, data in _chunks_backwards(fd, start, end):
+        pos = len(data)
+        while True:
+            pos = data.rfind(b"\n", 0, pos)
+            if pos < 0:
+                break
+            lines -= 1
+            if lines == 0:
+                return chunk_start + pos + 1
+    return start
+
+
+def _chunks_backwards(fd: int, start: int, end: int, overlap: int = 0) -> Iterator[tuple[int, bytes]]:
+    """
+    Yields the chunks of the file between start and end, starting with the last one, with their offsets.
+    Each chunk also contains the first `overlap` bytes of the chunk after it, so matches spanning both are found.
+    Stops if the file was truncated.
+    """
+    pos = end
+    while pos > start:
+        chunk_start = max(start, pos - READ_CHUNK_SIZE)
+        chunk_end = min(end, pos + overlap)
+        data = os.pread(fd, chunk_end - chunk_start, chunk_start)
+        if len(data) < chunk_end - chunk_start:
+            return
+        yield chunk_start, data
+        pos = chunk_start
+
+
+def _chunks_forwards(fd: int, start: int, end: int) -> Iterator[tuple[int, bytes]]:
+    """Yields the chunks of the file between start and end, with their offsets. Stops if the file was truncated."""
+    pos = start
+    while pos < end:
+        data = os.pread(fd, min(READ_CHUNK_SIZE, end - pos), pos)
+        if not data:
+            return
+        yield pos, data
+        pos += len(data)
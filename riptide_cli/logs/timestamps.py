@@ -0,0 +1,68 @@
+"""
+Detecting the time a line of a log file was logged at.
+
+Each supported format has its own parser; the first one matching near the start of the line is used:
+
+- ISO 8601 and similar: ``2024-01-31 12:00:00``, ``2024-01-31T12:00:00.123Z``, ``2024/01/31 12:00:00`` (nginx)
+- Access logs: ``[31/Jan/2024:12:00:00 +0000]``
+- PHP: ``[31-Jan-2024 12:00:00]``
+- Syslog: ``Jan 31 12:00:00`` (the current year is assumed)
+
+Timestamps without a time zone are in local time.
+"""
+
+import re
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+
+# Only this many bytes at the start of each line are searched for the timestamp.
+DETECTION_LENGTH = 200
+
+_MONTHS = {m: i for i, m in enumerate(b"Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split(), start=1)}
+_TZ = rb"(?:\s?(Z|[+-]\d\d:?\d\d))?"
+
+
+def _tz(value: bytes | None) -> timezone | None:
+    if value is None:
+        return None
+    if value == b"Z":
+        return timezone.utc
+    sign = -1 if value.startswith(b"-") else 1
+    digits = value[1:].replace(b":", b"")
+    return timezone(sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:])))
+
+
+def _iso(match: re.Match[bytes]) -> datetime:
+    year, month, day, hour, minute, second, tz = match.groups()
+    return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second), tzinfo=_tz(tz))
+
+
+def _named_month(match: re.Match[bytes]) -> datetime:
+    day, month, year, hour, minute, second, tz = match.groups()
+    return datetime(int(year), _MONTHS[month], int(day), int(hour), int(minute), int(second), tzinfo=_tz(tz))
+
+
+def _syslog(match: re.Match[bytes]) -> datetime:
+    month, day, hour, minute, second = match.groups()
+    return datetime(datetime.now().year, _MONTHS[month], int(day), int(hour), int(minute), int(second))
+
+
+_MONTH = b"(" + b"|".join(_MONTHS) + b")"
+_PARSERS: list[tuple[re.Pattern[bytes], Callable[[re.Match[bytes]], datetime]]] = [
+    (re.compile(rb"(\d{4})[-/](\d\d)[-/](\d\d)[T ](\d\d):(\d\d):(\d\d)(?:[.,]\d+)?" + _TZ), _iso),
+    (re.compile(rb"(\d\d)/" + _MONTH + rb"/(\d{4}):(\d\d):(\d\d):(\d\d)" + _TZ), _named_month),
+    (re.compile(rb"(\d\d)-" + _MONTH + rb"-(\d{4}) (\d\d):(\d\d):(\d\d)" + _TZ), _named_month),
+    (re.compile(rb"^" + _MONTH + rb" +(\d{1,2}) (\d\d):(\d\d):(\d\d)"), _syslog),
+]
+
+
+def detect_time(line: bytes) -> float | None:
+    """Returns the time (UNIX timestamp) of the line or None, if it contains no supported timestamp."""
+    for pattern, parse in _PARSERS:
+        match = pattern.search(line, 0, DETECTION_LENGTH)
+        if match:
+            try:
+                return parse(match).timestamp()
+            except ValueError:
+                return None
+    return None
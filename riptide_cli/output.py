@@ -0,0 +1,53 @@
+"""
+Machine readable output of commands.
+
+Commands supporting it have a ``--format`` option (see format_option). With ``json``, the command prints a single
+JSON document. With ``ndjson``, it prints one JSON object per line for each entry (for example for each service).
+In both cases, nothing is rendered with rich and all other output (warnings, etc.) goes to stderr.
+"""
+
+import json
+import sys
+from typing import Any
+
+import click
+
+FORMAT_TEXT = "text"
+FORMAT_JSON = "json"
+FORMAT_NDJSON = "ndjson"
+STRUCTURED_FORMATS = (FORMAT_JSON, FORMAT_NDJSON)
+# Key in the meta dict of the Click context, set by format_option if the sub command requests machine readable output.
+META_STRUCTURED_OUTPUT = "riptide_structured_output"
+
+
+def format_option(f):
+    """Adds the --format option to a command. The value is passed as 'output_format'."""
+    return click.option(
+        "--format",
+        "output_format",
+        type=click.Choice([FORMAT_TEXT, *STRUCTURED_FORMATS]),
+        default=FORMAT_TEXT,
+        show_default=True,
+        callback=_format_option_callback,
+        help="Output format. json and ndjson print machine readable output.",
+    )(f)
+
+
+def _format_option_callback(ctx: click.Context, _param: click.Parameter, value: str) -> str:
+    if value in STRUCTURED_FORMATS:
+        ctx.meta[META_STRUCTURED_OUTPUT] = True
+    return value
+
+
+def print_structured(output_format: str, document: dict[str, Any], entries: list[dict[str, Any]]):
+    """
+    Prints machine readable output.
+    :param output_format: json or ndjson
+    :param document:      Printed as a whole in json format
+    :param entries:       Printed one per line in ndjson format
+    """
+    if output_format == FORMAT_NDJSON:
+        sys.stdout.write("".join(json.dumps(entry) + "\n" for entry in entries))
+    else:
+        sys.stdout.write(json.dumps(document) + "\n")
+    sys.stdout.flush()
@@ -0,0 +1,219 @@
+"""
+Waiting for the database to accept connections after it was started.
+
+The first of these probes that can be used for the database service is polled, with exponential backoff:
+
+- The database driver, if it implements ``ping(engine) -> bool``.
+- TCP: Connecting to the ports of the database driver on the host. Connections that the port forwarding of the
+  engine accepts, but closes right away, mean the database is not listening yet. The ports are only known
+  once the service was started.
+- Logs: A line signaling readiness (see READY_LOG_MARKERS) in the stdout/stderr logs of the service, logged
+  after the probe was created. To initialize an empty data directory, the MySQL, MariaDB and PostgreSQL images
+  first run a temporary server without networking, which logs the same lines; these are ignored.
+
+If none of them can be used, FALLBACK_DELAY seconds are waited instead. The timeout (in seconds) can be
+changed with the environment variable ``RIPTIDE_DB_READY_TIMEOUT``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from riptide.config.document.project import Project
+from riptide.config.document.service import Service
+from riptide.config.service.logging import get_logging_path_for
+from riptide.config.service.ports import get_existing_port_mapping
+from riptide.db.driver.abstract import AbstractDbDriver
+from riptide.engine.abstract import AbstractEngine
+from riptide_cli.helpers import run_in_thread, warn
+
+if TYPE_CHECKING:
+    from riptide_cli.loader import RiptideCliCtx
+
+ENV_READY_TIMEOUT = "RIPTIDE_DB_READY_TIMEOUT"
+DEFAULT_READY_TIMEOUT = 120.0
+FALLBACK_DELAY = 15.0
+FIRST_POLL_INTERVAL = 0.1
+MAX_POLL_INTERVAL = 2.0
+CONNECT_TIMEOUT = 1.0
+# How long a connection must stay open (or the time until the server greets) to count as accepted.
+ACCEPT_TIMEOUT = 0.3
+READY_LOG_MARKERS = (
+    b"ready for connections",  # MySQL, MariaDB
+    b"ready to accept connections",  # PostgreSQL, Redis
+    b"Waiting for connections",  # MongoDB
+)
+SHUTDOWN_LOG_MARKERS = (
+    b"Shutdown complete",  # MySQL, MariaDB
+    b"database system is shut down",  # PostgreSQL
+    b"Now exiting",  # MongoDB
+)
+# MySQL and MariaDB servers without networking log this on the line signaling readiness or the line after it.
+NO_NETWORK_LOG_MARKER = b"port: 0"
+# PostgreSQL servers log the start and then whether they listen on TCP, before signaling readiness.
+PG_START_LOG_MARKER = b"starting PostgreSQL"
+PG_LISTEN_LOG_MARKER = b"listening on IPv"
+
+Probe = Callable[[], bool]
+
+
+def ready_timeout() -> float:
+    try:
+        return float(os.environ[ENV_READY_TIMEOUT])
+    except (KeyError, ValueError):
+        return DEFAULT_READY_TIMEOUT
+
+
+def db_readiness_probe(
+    project: Project, engine: AbstractEngine, service: Service, db_driver: AbstractDbDriver
+) -> Probe | None:
+    """
+    Returns the probe for whether the database service accepts connections, None if there is none.
+    Must be created before the service is started and used after it was started.
+    """
+    ping = getattr(db_driver, "ping", None)
+    if callable(ping):
+        return lambda: bool(ping(engine))
+    start_ports = [entry["host_start"] for entry in (db_driver.collect_additional_ports() or {}).values()]
+    log_probe = None
+    if "logging" in service:
+        paths = [
+            get_logging_path_for(service, logkey)
+            for logkey in ("stdout", "stderr")
+            if logkey in service["logging"] and service["logging"][logkey]
+        ]
+        if paths:
+            log_probe = LogProbe(paths)
+    if not start_ports and log_probe is None:
+        return None
+
+    def probe() -> bool:
+        # Port mappings of services that were never started before only exist after starting them.
+        ports = [get_existing_port_mapping(project, service, start_port) for start_port in start_ports]
+        if any(ports):
+            return all(_accepts("127.0.0.1", port) for port in ports if port)
+        return log_probe is not None and log_probe()
+
+    return probe
+
+
+class LogProbe:
+    """
+    Probe for whether any of the log files signals readiness of the server, since the probe was created.
+    Lines of servers without networking are ignored and servers that shut down afterwards are not ready.
+    """
+
+    def __init__(self, paths: list[str]):
+        self.logs = {path: _LogState(_size(path)) for path in paths}
+
+    def __call__(self) -> bool:
+        for path, state in self.logs.items():
+            if _size(path) < state.offset:
+                # Truncated or replaced
+                state = self.logs[path] = _LogState(0)
+            try:
+                with open(path, "rb") as file:
+                    file.seek(state.offset)
+                    data = file.read()
+            except OSError:
+                continue
+            # Only complete lines; the rest is read again next time.
+            end = data.rfind(b"\n") + 1
+            state.offset += end
+            state.feed(data[:end].splitlines())
+            if state.ready:
+                return True
+        return False
+
+
+class _LogState:
+    """What the lines of a log file read so far say about the server."""
+
+    def __init__(self, offset: int):
+        self.offset = offset
+        self.ready = False
+        # Readiness signaled on the last line read, without saying whether the server has networking.
+        self.unconfirmed = False
+        # Whether the server is PostgreSQL, and whether it listens on TCP.
+        self.postgres = False
+        self.listening = False
+
+    def feed(self, lines: list[bytes]):
+        if not lines and self.unconfirmed:
+            # Nothing was logged after it since the last time.
+            self.ready = True
+        for line in lines:
+            if self.unconfirmed:
+                self.ready = NO_NETWORK_LOG_MARKER not in line
+                self.unconfirmed = False
+            if any(marker in line for marker in SHUTDOWN_LOG_MARKERS):
+                self.ready = self.unconfirmed = self.listening = False
+            elif PG_START_LOG_MARKER in line:
+                self.postgres = True
+                self.listening = False
+            elif PG_LISTEN_LOG_MARKER in line:
+                self.listening = True
+            elif any(marker in line for marker in READY_LOG_MARKERS):
+                if self.postgres:
+                    self.ready = self.listening
+                elif b"port: " in line:
+                    self.ready = NO_NETWORK_LOG_MARKER not in line
+                else:
+                    # MariaDB logs the port on the next line.
+                    self.unconfirmed = True
+
+
+async def wait_until_ready(probe: Probe, timeout: float) -> bool:
+    """Polls the probe until it succeeds (returns True) or the timeout is reached (returns False)."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    interval = FIRST_POLL_INTERVAL
+    while True:
+        try:
+            if await asyncio.wrap_future(run_in_thread(probe)):
+                return True
+        except Exception:
+            # Not ready (yet)
+            pass
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+
+async def wait_for_db(ctx: RiptideCliCtx, probe: Probe | None):
+    """Waits until the started database accepts connections, warns if it does not in time."""
+    if probe is None:
+        await asyncio.sleep(FALLBACK_DELAY)
+        return
+    timeout = ready_timeout()
+    with ctx.console.status("Waiting for the database to accept connections..."):
+        ready = await wait_until_ready(probe, timeout)
+    if not ready:
+        warn(ctx.console, f"The database did not accept connections within {timeout:g} seconds. Trying anyway.")
+
+
+def _accepts(host: str, port: int) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=CONNECT_TIMEOUT) as sock:
+            sock.settimeout(ACCEPT_TIMEOUT)
+            try:
+                # Either the server greets (MySQL) or waits for the client (PostgreSQL). Port forwardings
+                # without a listening server close the connection.
+                return sock.recv(1) != b""
+            except TimeoutError:
+                return True
+    except OSError:
+        return False
+
+
+def _size(path: str) -> int:
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
@@ -7,8 +7,8 @@ SCRIPTPATH=$(dirname "${BASH_SOURCE[0]}")
 . "$SCRIPTPATH/riptide.hook.common.sh"
 
 riptide_prompt_hook() {
-    if [ "$(pwd)" != "$RIPTIDE_BASH_LAST_PWD" ]; then
-        RIPTIDE_BASH_LAST_PWD=$(pwd)
+    if [ "$PWD" != "$RIPTIDE_BASH_LAST_PWD" ]; then
+        RIPTIDE_BASH_LAST_PWD=$PWD
         riptide_cwdir_hook
     fi
 }
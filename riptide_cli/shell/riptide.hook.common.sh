@@ -1,4 +1,19 @@
 # Common file for Riptide's shell integration
+# Only uses shell builtins, the hook must not start any processes.
+
+# Index of the roots of all projects known to Riptide, one per line. Written by Riptide whenever a project is
+# added to or removed from the projects.json file. Can be overwritten with RIPTIDE_PROJECT_INDEX.
+if [ -n "$RIPTIDE_PROJECT_INDEX" ]; then
+    RIPTIDE__SH_INDEX="$RIPTIDE_PROJECT_INDEX"
+elif [ -n "$RIPTIDE_CONFIG_DIR" ]; then
+    RIPTIDE__SH_INDEX="$RIPTIDE_CONFIG_DIR/projects.index"
+elif [ -d "$HOME/Library/Application Support/riptide" ]; then
+    RIPTIDE__SH_INDEX="$HOME/Library/Application Support/riptide/projects.index"
+else
+    RIPTIDE__SH_INDEX="${XDG_CONFIG_HOME:-$HOME/.config}/riptide/projects.index"
+fi
+# Project roots found by this shell, one per line.
+RIPTIDE__SH_ROOTS=""
 
 # Shell integration script. To be called whenever the working directory changes.
 # Always sets the env. variable RIPTIDE_SHELL_LOADED to "yes"
@@ -8,13 +23,28 @@
 #  Adds the _riptide/bin path of the current project to the PATH
 # If not:
 #  Undos above changes.
+#
+# Projects that are listed in the index or were found before by this shell are looked up without touching
+# the file system (other than checking that the riptide.yml still exists). Only if the working directory is
+# in none of these, the directory tree is searched for a riptide.yml.
 riptide_cwdir_hook() {
     export RIPTIDE_SHELL_LOADED="yes"
-    # find the project path by walking up the directory tree until found or / is reached.
-    project_path=$(pwd)
-    while [[ "$project_path" != "" && ! -e "$project_path/riptide.yml" ]]; do
-        project_path=${project_path%/*}
-    done
+    local project_path
+    riptide_cwdir_hook__find_known "$PWD"
+    project_path=$RIPTIDE__SH_FOUND
+    if [ -n "$project_path" ] && [ ! -e "$project_path/riptide.yml" ]; then
+        project_path=""
+    fi
+    if [ -z "$project_path" ]; then
+        # find the project path by walking up the directory tree until found or / is reached.
+        project_path=$PWD
+        while [[ "$project_path" != "" && ! -e "$project_path/riptide.yml" ]]; do
+            project_path=${project_path%/*}
+        done
+        if [ -n "$project_path" ]; then
+            RIPTIDE__SH_ROOTS="$RIPTIDE__SH_ROOTS$project_path"$'\n'
+        fi
+    fi
     if [ ! -z "$project_path" ]; then
         # WE ARE IN PROJECT
         new_sh_path="$project_path/_riptide/bin"
@@ -27,7 +57,11 @@ riptide_cwdir_hook() {
             # Add to path
             export PATH="$RIPTIDE__SH_BIN_PATH:$PATH"
         fi
-        export RIPTIDE_PROJECT_NAME=$(cat "$project_path/_riptide/name" 2> /dev/null)
+        RIPTIDE_PROJECT_NAME=""
+        if [ -r "$project_path/_riptide/name" ]; then
+            IFS= read -r RIPTIDE_PROJECT_NAME < "$project_path/_riptide/name"
+        fi
+        export RIPTIDE_PROJECT_NAME
     else
         # WE ARE NOT IN PROJECT
         if [ ! -z "$RIPTIDE__SH_BIN_PATH" ]; then
@@ -37,8 +71,40 @@ riptide_cwdir_hook() {
     fi
 }
 
+# Sets RIPTIDE__SH_FOUND to the deepest project root from the index or the roots found before,
+# that contains the given directory. Empty if there is none.
+riptide_cwdir_hook__find_known() {
+    local roots candidate line
+    RIPTIDE__SH_FOUND=""
+    roots=$RIPTIDE__SH_ROOTS
+    if [ -r "$RIPTIDE__SH_INDEX" ]; then
+        while IFS= read -r line || [ -n "$line" ]; do
+            roots="$roots$line"$'\n'
+        done < "$RIPTIDE__SH_INDEX"
+    fi
+    while [ -n "$roots" ]; do
+        candidate=${roots%%$'\n'*}
+        roots=${roots#*$'\n'}
+        if [ -z "$candidate" ]; then
+            continue
+        fi
+        case "$1/" in
+            "$candidate"/*)
+                if [ ${#candidate} -gt ${#RIPTIDE__SH_FOUND} ]; then
+                    RIPTIDE__SH_FOUND=$candidate
+                fi
+                ;;
+        esac
+    done
+}
+
 riptide_cwdir_hook__remove() {
-    # Remove riptide project bin path from path. Source: https://stackoverflow.com/a/370192
-    export PATH=$(echo -n ${PATH} | awk -v RS=: -v ORS=: "/$(echo $RIPTIDE__SH_BIN_PATH | sed 's/\//\\\//g')/ {next} {print}")
+    # Remove riptide project bin path from path.
+    local new_path=":$PATH:"
+    while [[ "$new_path" == *":$RIPTIDE__SH_BIN_PATH:"* ]]; do
+        new_path=${new_path//":$RIPTIDE__SH_BIN_PATH:"/:}
+    done
+    new_path=${new_path#:}
+    export PATH="${new_path%:}"
     RIPTIDE__SH_BIN_PATH=""
 }
@@ -5,11 +5,30 @@ import sys
 from riptide.config.command import in_service
 from riptide.config.document.command import KEY_IDENTIFIER_IN_SERVICE_COMMAND
 from riptide.config.document.config import Config
-from riptide.config.files import get_project_meta_folder
-from riptide.config.loader import load_config
+from riptide.config.files import get_project_meta_folder, riptide_config_dir
+from riptide.config.loader import load_projects
 from riptide.engine.loader import load_engine
+from riptide_cli.config_cache import load_config_cached
+from riptide_cli.fingerprints import file_stat
 from setproctitle import setproctitle
 
+# Index of all project roots, used by the shell hooks. See riptide.hook.common.sh.
+PROJECT_INDEX_FILE_NAME = "projects.index"
+
+
+def project_index_path() -> str:
+    return os.path.join(riptide_config_dir(), PROJECT_INDEX_FILE_NAME)
+
+
+def update_project_index():
+    """
+    Writes the index of the roots of all projects in the projects.json file, one per line. The shell hooks
+    use it to find the current project without searching the directory tree.
+    """
+    roots = sorted({os.path.dirname(path) for path in load_projects().values()})
+    with open(project_index_path(), "w") as index_file:
+        index_file.write("".join(root + "\n" for root in roots))
+
 
 def update_shell_integration(system_config: Config):
     """
@@ -38,25 +57,48 @@ def update_shell_integration(system_config: Config):
     # The executable can be overwritten via env if needed
     executable = os.environ.get("RIPTIDE_SHELL_INTEGRATION_EXECUTABLE", sys.executable)
 
-    # Create command alias files that don't exist yet:
-    to_add = commands - command_files
-    for entry in to_add:
+    # Create command alias files that don't exist yet or are outdated:
+    for entry in commands:
         path_to_cmd_file = os.path.join(bin_folder, entry)
-        with open(path_to_cmd_file, "w") as file:
-            file.write(f"""#!{executable}
+        content = f"""#!{executable}
 import sys
-from riptide_cli.shell_integration import run_cmd
+from riptide_cli.client import run_cmd
 run_cmd("{entry}", sys.argv[1:])
-""")
+"""
+        if entry in command_files:
+            with open(path_to_cmd_file) as file:
+                if file.read() == content:
+                    continue
+        with open(path_to_cmd_file, "w") as file:
+            file.write(content)
 
         # Make command alias executable
         st = os.stat(path_to_cmd_file)
         os.chmod(path_to_cmd_file, st.st_mode | stat.S_IEXEC)
 
 
+def shell_integration_inputs(system_config: Config):
+    """
+    Returns everything update_shell_integration depends on. If these did not change,
+    update_shell_integration does not need to run again.
+    """
+    meta_folder = get_project_meta_folder(system_config["project"].folder())
+    if "commands" in system_config["project"]["app"]:
+        commands = sorted(system_config["project"]["app"]["commands"].keys())
+    else:
+        commands = []
+    return [
+        system_config["project"]["name"],
+        commands,
+        os.environ.get("RIPTIDE_SHELL_INTEGRATION_EXECUTABLE", sys.executable),
+        file_stat(os.path.join(meta_folder, "name")),
+        file_stat(os.path.join(meta_folder, "bin")),
+    ]
+
+
 def run_cmd(command_name, arguments):
     """Directly run a command in the project found the user is currently in."""
-    system_config = load_config()
+    system_config = load_config_cached()
     engine = load_engine(system_config["engine"])
     system_config.load_performance_options(engine)
 
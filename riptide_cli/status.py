@@ -0,0 +1,125 @@
+"""
+Collecting the status of the services of a project.
+
+The status of all services is queried from the engine concurrently, each with a timeout. Services that don't
+report their status in time have an unknown status. The results are shared by all commands of one
+invocation of the CLI (see status_collector) and only queried again, if the services were started or stopped.
+
+The timeout (in seconds) can be changed with the option ``--status-timeout`` (or the environment variable
+``RIPTIDE_STATUS_TIMEOUT``).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from concurrent.futures import Future, wait
+from typing import TYPE_CHECKING, Any
+
+from riptide.config.document.config import Config
+from riptide.config.document.project import Project
+from riptide.config.service.ports import get_existing_port_mapping
+from riptide.engine.abstract import AbstractEngine
+from riptide.engine.status import AdditionalPortsEntry, StatusResult
+from riptide_cli.helpers import run_in_thread
+
+if TYPE_CHECKING:
+    from riptide_cli.loader import RiptideCliCtx
+
+DEFAULT_STATUS_TIMEOUT = 10.0
+
+
+class StatusCollector:
+    """
+    Collects and remembers the status of the services of a project.
+    The status of a service is None, if it is unknown, because the engine did not report it in time.
+    """
+
+    project: Project
+    engine: AbstractEngine
+    system_config: Config
+    timeout: float
+    _results: dict[str, StatusResult]
+
+    def __init__(self, project: Project, engine: AbstractEngine, system_config: Config, timeout: float | None = None):
+        self.project = project
+        self.engine = engine
+        self.system_config = system_config
+        self.timeout = timeout if timeout is not None else DEFAULT_STATUS_TIMEOUT
+        self._results = {}
+
+    def collect(self, services: Iterable[str] | None = None) -> dict[str, StatusResult | None]:
+        """
+        Returns the status of the given services (default: all), sorted by service name.
+        Only services without a known status are queried from the engine.
+        """
+        if services is None:
+            services = self.project["app"]["services"].keys()
+        names = sorted(services)
+
+        futures: dict[str, Future] = {}
+        for name in names:
+            if name not in self._results:
+                futures[name] = run_in_thread(self.engine.service_status, self.project, name)
+        wait(futures.values(), timeout=self.timeout)
+        for name, future in futures.items():
+            # Errors of the engine are raised, services that timed out stay unknown.
+            if future.done():
+                self._results[name] = self._status_result(name, bool(future.result()))
+
+        return {name: self._results.get(name) for name in names}
+
+    def running(self, service: str) -> bool | None:
+        """Returns whether the service is running or None, if unknown."""
+        result = self.collect([service])[service]
+        return None if result is None else result.running
+
+    def invalidate(self, services: Iterable[str] | None = None):
+        """Forgets the status of the given services (default: all), for example because they were started."""
+        if services is None:
+            self._results = {}
+        else:
+            for name in services:
+                self._results.pop(name, None)
+
+    def _status_result(self, name: str, running: bool) -> StatusResult:
+        """Like riptide.engine.status.status_for, for a single service."""
+        if not running:
+            return StatusResult(running=False, web=None, additional_ports=[])
+        service = self.project["app"]["services"][name]
+        proxy_url = None
+        if "port" in service:
+            proxy_url = "https://" + service.domain()
+        additional_ports = []
+        if "additional_ports" in service:
+            for entry in service["additional_ports"].values():
+                port_host = get_existing_port_mapping(self.project, service, entry["host_start"])
+                if port_host:
+                    additional_ports.append(
+                        AdditionalPortsEntry(title=entry["title"], container=entry["container"], host=port_host)
+                    )
+        return StatusResult(running=True, web=proxy_url, additional_ports=additional_ports)
+
+
+def status_to_dict(name: str, result: StatusResult | None) -> dict[str, Any]:
+    """Machine readable representation of the status of a service."""
+    if result is None:
+        return {"service": name, "status": "unknown", "web": None, "additional_ports": []}
+    return {
+        "service": name,
+        "status": "running" if result.running else "stopped",
+        "web": result.web,
+        "additional_ports": [port._asdict() for port in result.additional_ports],
+    }
+
+
+def status_collector(ctx: RiptideCliCtx) -> StatusCollector:
+    """Returns the status collector for the loaded project, shared by all commands of this invocation."""
+    assert ctx.system_config is not None
+    root = ctx.find_root()
+    project = ctx.system_config["project"]
+    collector: StatusCollector | None = getattr(root, "riptide_status_collector", None)
+    if collector is None or collector.project is not project:
+        timeout = getattr(root, "riptide_options", {}).get("status_timeout")
+        collector = StatusCollector(project, ctx.engine, ctx.system_config, timeout)
+        root.riptide_status_collector = collector  # type: ignore
+    return collector
@@ -0,0 +1,183 @@
+"""
+Progress of database imports and exports.
+
+The database drivers read the dumps and write the exports themselves (usually inside of the database container),
+so the amount of data transferred can not be counted while it is streamed. Instead, the driver runs in a
+separate thread and the amount is sampled from the async loop:
+
+- Exports: The size of the target file or directory, while it is written.
+- Imports: The read position of the process that has the dump open, taken from ``/proc/<pid>/fdinfo``. This is
+  only possible on Linux, if the process is visible on the host (not with Docker Desktop). Otherwise, and for
+  dumps that are directories, only the elapsed time is shown.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections.abc import Callable
+from typing import TypeVar
+
+from rich.console import Console
+from rich.filesize import decimal
+from rich.live import Live
+from rich.panel import Panel
+from rich.progress import (
+    BarColumn,
+    DownloadColumn,
+    Progress,
+    TaskProgressColumn,
+    TextColumn,
+    TimeElapsedColumn,
+    TimeRemainingColumn,
+    TransferSpeedColumn,
+)
+from riptide_cli.helpers import run_in_thread
+
+# Seconds between two samples of the amount of data transferred.
+SAMPLE_INTERVAL = 0.5
+# Seconds between two searches for the process reading a dump, until it was found.
+READER_SEARCH_INTERVAL = 1.0
+
+T = TypeVar("T")
+Sampler = Callable[[], int | None]
+
+
+def path_size(path: str) -> int:
+    """Returns the size of the file or the total size of all files in the directory, 0 if it does not exist."""
+    if not os.path.isdir(path):
+        try:
+            return os.stat(path).st_size
+        except OSError:
+            return 0
+    size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                size += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return size
+
+
+class ReadPosition:
+    """Sampler for the read position in a file, of the process that has it open."""
+
+    def __init__(self, path: str):
+        st = os.stat(path)
+        self.identity = (st.st_dev, st.st_ino)
+        self.fdinfo: str | None = None
+        self.position: int | None = None
+        self.last_search = 0.0
+
+    def __call__(self) -> int | None:
+        if self.fdinfo is not None:
+            position = _fdinfo_position(self.fdinfo)
+            if position is not None:
+                self.position = max(self.position or 0, position)
+                return self.position
+            # The process closed the file; maybe another one opens it next.
+            self.fdinfo = None
+        if time.monotonic() - self.last_search >= READER_SEARCH_INTERVAL:
+            self.fdinfo = _find_reader(self.identity)
+            self.last_search = time.monotonic()
+        return self.position
+
+
+def unknown_progress() -> int | None:
+    """Sampler for transfers whose progress is not known."""
+    return None
+
+
+def import_sampler(path: str) -> Sampler:
+    """Returns the sampler for the progress of importing the dump at path."""
+    if os.path.isdir(path):
+        return unknown_progress
+    return ReadPosition(path)
+
+
+def export_sampler(path: str) -> Sampler:
+    """Returns the sampler for the progress of exporting to path."""
+    return lambda: path_size(path)
+
+
+async def track_transfer(
+    console: Console,
+    title: str,
+    description: str,
+    work: Callable[[], T],
+    sample: Sampler,
+    total: int | None,
+    done_message: str,
+) -> T:
+    """
+    Runs work in a separate thread and shows the progress of the transfer in a panel, until it is done.
+    sample returns the number of bytes transferred so far, or None if that is not known.
+    total is the number of bytes to transfer, if known. When done, done_message is shown with a summary.
+    """
+    progress = Progress(
+        TextColumn("{task.description}"),
+        BarColumn(),
+        TaskProgressColumn(),
+        DownloadColumn(),
+        TransferSpeedColumn(),
+        TimeRemainingColumn(),
+        TimeElapsedColumn(),
+    )
+    task = progress.add_task(description, total=total)
+    panel = Panel(progress, title=title, title_align="left")
+    start = time.monotonic()
+    transferred: int | None = None
+    with Live(panel, refresh_per_second=5, console=console):
+        future = asyncio.wrap_future(run_in_thread(work))
+        while not future.done():
+            sampled = await asyncio.wrap_future(run_in_thread(sample))
+            if sampled is not None:
+                transferred = sampled
+                progress.update(task, completed=transferred)
+            await asyncio.wait([future], timeout=SAMPLE_INTERVAL)
+        result = future.result()
+        transferred = total if total is not None else sample()
+        panel.renderable = f"{done_message} {_summary(transferred, time.monotonic() - start)}"
+    return result
+
+
+def _summary(transferred: int | None, elapsed: float) -> str:
+    took = time.strftime("%H:%M:%S", time.gmtime(elapsed))
+    if not transferred:
+        return f"(took {took})"
+    return f"({decimal(transferred)} in {took}, {decimal(int(transferred / max(elapsed, 0.001)))}/s)"
+
+
+def _fdinfo_position(fdinfo: str) -> int | None:
+    try:
+        with open(fdinfo) as fp:
+            for line in fp:
+                if line.startswith("pos:"):
+                    return int(line[4:])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _find_reader(identity: tuple[int, int]) -> str | None:
+    """Returns the fdinfo path of a file descriptor of any process that refers to the file, if there is one."""
+    try:
+        pids = [pid for pid in os.listdir("/proc") if pid.isdigit()]
+    except OSError:
+        return None
+    for pid in pids:
+        fd_dir = f"/proc/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                st = os.stat(f"{fd_dir}/{fd}")
+            except OSError:
+                continue
+            if (st.st_dev, st.st_ino) == identity:
+                return f"/proc/{pid}/fdinfo/{fd}"
+    return None
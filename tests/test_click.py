@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+import click
+from riptide.plugin import loader
+from riptide_cli.__main__ import SUBCOMMAND_MODULES
+from riptide_cli.click import ClickMainGroup
+from riptide_cli.command.constants import CMD_STATUS
+
+
+def _main_group() -> ClickMainGroup:
+    return ClickMainGroup(name="riptide", lazy_subcommands=SUBCOMMAND_MODULES)
+
+
+def test_get_command_only_loads_the_module_of_the_command(monkeypatch):
+    main = _main_group()
+    monkeypatch.setattr(main, "_has_plugins", lambda: False)
+
+    with click.Context(main) as ctx:
+        assert main.get_command(ctx, CMD_STATUS) is not None
+
+    assert main._loaded_modules == {"riptide_cli.command.project"}
+
+
+def test_plugins_can_change_built_in_commands(monkeypatch):
+    def after_load_cli(main):
+        main.commands[CMD_STATUS].help = "Changed by a plugin."
+
+    main = _main_group()
+    monkeypatch.setattr(main, "_has_plugins", lambda: True)
+    monkeypatch.setattr(loader, "load_plugins", lambda: {"plugin": SimpleNamespace(after_load_cli=after_load_cli)})
+
+    with click.Context(main) as ctx:
+        assert main.get_command(ctx, CMD_STATUS).help == "Changed by a plugin."
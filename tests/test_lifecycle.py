@@ -0,0 +1,59 @@
+import io
+from types import SimpleNamespace
+
+from rich.console import Console
+from riptide.engine.status import StatusResult
+from riptide_cli import lifecycle
+
+
+class FakeClock:
+    """Replaces time.monotonic and time.sleep. Interrupts the watch once the given time is reached."""
+
+    def __init__(self, until: float):
+        self.now = 0.0
+        self.until = until
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+        if self.now > self.until:
+            raise KeyboardInterrupt
+
+
+class FakeCollector:
+    """Status collector of a single service that starts or stops on every poll."""
+
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.running = True
+        self.polls: list[float] = []
+
+    def collect(self, services=None):
+        if services is not None:
+            self.polls.append(self.clock.now)
+            self.running = not self.running
+        return {"www": StatusResult(self.running, None, [])}
+
+    def invalidate(self, services=None):
+        pass
+
+
+def test_status_watch_polls_at_short_intervals(monkeypatch):
+    clock = FakeClock(until=1.0)
+    collector = FakeCollector(clock)
+    monkeypatch.setattr(lifecycle.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(lifecycle.time, "sleep", clock.sleep)
+    monkeypatch.setattr(lifecycle, "status_collector", lambda _ctx: collector)
+    monkeypatch.setattr(lifecycle, "_status_project_render_group", lambda *_args: "")
+    ctx = SimpleNamespace(
+        system_config={"project": object()},
+        project_is_set_up=True,
+        console=Console(file=io.StringIO()),
+    )
+
+    lifecycle.status_project_watch(ctx, interval=0.2)
+
+    assert len(collector.polls) > 1
+    assert all(later - earlier < 0.3 for earlier, later in zip(collector.polls, collector.polls[1:]))
@@ -0,0 +1,27 @@
+from riptide_cli.__main__ import cli
+from riptide_cli.output import META_STRUCTURED_OUTPUT
+
+
+def _structured_output(args: list[str]) -> bool:
+    with cli.make_context("riptide", args) as ctx:
+        cli._parse_sub_command_options(ctx)
+        return ctx.meta.get(META_STRUCTURED_OUTPUT, False)
+
+
+def test_format_option_requests_structured_output():
+    assert _structured_output(["status", "--format", "json"])
+    assert _structured_output(["status", "--format=ndjson"])
+    assert not _structured_output(["status", "--format", "text"])
+    assert not _structured_output(["status"])
+
+
+def test_cmd_passes_options_after_the_command_name_to_the_project_command():
+    assert not _structured_output(["cmd", "mytool", "--format", "json"])
+    assert _structured_output(["cmd", "--format", "json"])
+
+    with cli.make_context("riptide", ["cmd"]) as ctx:
+        cmd = cli.get_command(ctx, "cmd")
+        with cmd.make_context("cmd", ["mytool", "--format", "json", "--help"], parent=ctx) as cmd_ctx:
+            assert cmd_ctx.params["command"] == "mytool"
+            assert cmd_ctx.params["arguments"] == ("--format", "json", "--help")
+            assert cmd_ctx.params["output_format"] == "text"